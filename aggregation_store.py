@@ -0,0 +1,162 @@
+import os
+import math
+from array import array
+
+class AggregationStore:
+    """
+    Итоги разбора в колоночном виде. Материалы, файлы и подпапки интернированы (хранятся один раз,
+    дальше — целые номера), а строки хранилища (материал, длина) лежат в массивах array:
+    строки одного файла идут подряд, поэтому выборка по файлу — срез, а свертки по подпапкам и
+    общий итог — один проход по срезам живых файлов. Суммы считаются точно (math.fsum), поэтому итог не зависит
+    от порядка, в котором файлы (или частичные результаты шардов) были добавлены.
+    Порядок сортировки материалов и файлов по sort_key вычисляется один раз и пересчитывается
+    только при появлении новых имен.
+    """
+
+    def __init__(self, sort_key=str):
+        self.sort_key = sort_key
+        self.material_ids = {}
+        self.materials = []
+        self.file_ids = {}
+        self.files = []
+        self.folder_ids = {}
+        self.folders = []
+        self.file_folders = array('I')  # номер подпапки каждого файла
+        self.file_rows = []  # (начало, конец) строк файла; None — файл удален
+        self.row_materials = array('I')
+        self.row_lengths = array('d')
+        self.live_files = 0
+        self.dead_rows = 0
+        self._material_rank = None
+        self._file_order = None
+
+    def __len__(self):
+        return self.live_files
+
+    def __contains__(self, relative_path):
+        file_id = self.file_ids.get(relative_path)
+        return file_id is not None and self.file_rows[file_id] is not None
+
+    def _intern_material(self, material):
+        material_id = self.material_ids.get(material)
+        if material_id is None:
+            material_id = self.material_ids[material] = len(self.materials)
+            self.materials.append(material)
+            self._material_rank = None
+        return material_id
+
+    def _intern_file(self, relative_path):
+        file_id = self.file_ids.get(relative_path)
+        if file_id is None:
+            folder = os.path.dirname(relative_path)
+            folder_id = self.folder_ids.get(folder)
+            if folder_id is None:
+                folder_id = self.folder_ids[folder] = len(self.folders)
+                self.folders.append(folder)
+            file_id = self.file_ids[relative_path] = len(self.files)
+            self.files.append(relative_path)
+            self.file_folders.append(folder_id)
+            self.file_rows.append(None)
+        return file_id
+
+    def add_file(self, relative_path, file_data):
+        """Добавляет итоги файла {материал: длина}; прежние итоги того же файла заменяются. Пустые итоги не хранятся."""
+        if relative_path in self:
+            self.remove_file(relative_path)
+        if not file_data: return
+        file_id = self._intern_file(relative_path)
+        start = len(self.row_lengths)
+        for material, length in file_data.items():
+            material_id = self._intern_material(material)
+            self.row_materials.append(material_id)
+            self.row_lengths.append(length)
+        self.file_rows[file_id] = (start, len(self.row_lengths))
+        self.live_files += 1
+        self._file_order = None
+
+    def remove_file(self, relative_path):
+        """Убирает итоги файла и возвращает их ({материал: длина}, пусто — если файла не было)."""
+        file_data = self.file_totals(relative_path)
+        if not file_data: return file_data
+        file_id = self.file_ids[relative_path]
+        start, end = self.file_rows[file_id]
+        self.file_rows[file_id] = None
+        self.live_files -= 1
+        self.dead_rows += end - start
+        self._file_order = None
+        if self.dead_rows > len(self.row_lengths) // 2:
+            self._compact()
+        return file_data
+
+    def _compact(self):
+        # Строки удаленных файлов остаются в столбцах; когда их больше половины — столбцы пересобираются
+        row_materials, row_lengths = array('I'), array('d')
+        for file_id, rows in enumerate(self.file_rows):
+            if rows is None: continue
+            start, end = rows
+            self.file_rows[file_id] = (len(row_lengths), len(row_lengths) + end - start)
+            row_materials.extend(self.row_materials[start:end])
+            row_lengths.extend(self.row_lengths[start:end])
+        self.row_materials, self.row_lengths = row_materials, row_lengths
+        self.dead_rows = 0
+
+    def file_totals(self, relative_path):
+        file_id = self.file_ids.get(relative_path)
+        rows = self.file_rows[file_id] if file_id is not None else None
+        if rows is None: return {}
+        start, end = rows
+        return {self.materials[self.row_materials[row]]: self.row_lengths[row] for row in range(start, end)}
+
+    def material_rank(self):
+        """Место каждого материала (по номеру) в отсортированном по sort_key списке."""
+        if self._material_rank is None:
+            order = sorted(range(len(self.materials)), key=lambda material_id: self.sort_key(self.materials[material_id]))
+            rank = array('I', bytes(4 * len(order))) if order else array('I')
+            for position, material_id in enumerate(order):
+                rank[material_id] = position
+            self._material_rank = rank
+        return self._material_rank
+
+    def file_order(self):
+        """Номера живых файлов, отсортированные по sort_key пути."""
+        if self._file_order is None:
+            self._file_order = sorted(
+                (file_id for file_id, rows in enumerate(self.file_rows) if rows is not None),
+                key=lambda file_id: self.sort_key(self.files[file_id])
+            )
+        return self._file_order
+
+    def _sum_by_material(self, rows):
+        # Точные суммы длин строк rows по материалам: [(материал, длина), ...] в порядке sort_key
+        lengths = {}
+        for row in rows:
+            lengths.setdefault(self.row_materials[row], []).append(self.row_lengths[row])
+        rank = self.material_rank()
+        return [(self.materials[material_id], math.fsum(lengths[material_id])) for material_id in sorted(lengths, key=rank.__getitem__)]
+
+    def _live_rows(self, file_ids):
+        for file_id in file_ids:
+            start, end = self.file_rows[file_id]
+            yield from range(start, end)
+
+    def iter_files(self):
+        """Выдает (путь файла, [(материал, длина), ...]) в порядке sort_key путей и материалов."""
+        rank = self.material_rank()
+        for file_id in self.file_order():
+            start, end = self.file_rows[file_id]
+            rows = sorted(range(start, end), key=lambda row: rank[self.row_materials[row]])
+            yield self.files[file_id], [(self.materials[self.row_materials[row]], self.row_lengths[row]) for row in rows]
+
+    def grand_total(self):
+        """Общий итог [(материал, длина), ...] по всем файлам в порядке sort_key."""
+        return self._sum_by_material(self._live_rows(self.file_order()))
+
+    def folder_totals(self):
+        """Итоги по подпапкам: [(подпапка, [(материал, длина), ...]), ...] в порядке sort_key."""
+        folder_files = {}
+        for file_id in self.file_order():
+            folder_files.setdefault(self.file_folders[file_id], []).append(file_id)
+        return [
+            (self.folders[folder_id], self._sum_by_material(self._live_rows(folder_files[folder_id])))
+            for folder_id in sorted(folder_files, key=lambda folder_id: self.sort_key(self.folders[folder_id]))
+        ]
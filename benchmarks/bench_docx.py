@@ -0,0 +1,91 @@
+"""
+Бенчмарк и сверка чтения .docx: python-docx (parse_docx) против потокового разбора XML (parse_docx_stream).
+Генерирует документ с большой таблицей (включая объединенные по горизонтали и вертикали ячейки),
+проверяет, что строки таблиц и итоговые длины совпадают, и печатает время обоих способов.
+Запуск: python -m benchmarks.bench_docx --rows 5000
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from collections import defaultdict
+from docx import Document
+from docx_stream import iter_docx_rows
+from parser_engine import parse_docx, parse_docx_stream
+from benchmarks.bench_rules import SAMPLE_NAMES
+from benchmarks.corpus import journal_header
+
+def merge_cells_periodically(table, i, cells):
+    if i % 50 == 1:
+        cells[2].merge(cells[3])  # объединение по горизонтали
+    elif i % 50 == 2:
+        cells[1].merge(table.cell(i, 1))  # объединение с ячейкой строки выше (по вертикали)
+
+def make_docx(file_path, rows, seed=0, title="Журнал", tables=1, quantities=(0, 5), edit_row=merge_cells_periodically):
+    """
+    Документ с tables таблицами журнала по rows строк и таблицей без заголовков.
+    edit_row(таблица, номер строки, ячейки) дорабатывает только что заполненную строку (объединения ячеек
+    и т.п.); при tables > 1 после каждой таблицы добавляется абзац «Конец таблицы N».
+    """
+    rnd = random.Random(seed)
+    document = Document()
+    document.add_paragraph(title)
+    for table_number in range(tables):
+        table = document.add_table(rows=1, cols=5)
+        for cell, text in zip(table.rows[0].cells, journal_header()):
+            cell.text = text
+        for i in range(rows):
+            cells = table.add_row().cells
+            values = [str(i + 1), rnd.choice(SAMPLE_NAMES), rnd.choice(["", "Ст3", "C245"]),
+                      str(rnd.randint(*quantities)), str(rnd.choice([600, 1000, 2500]))]
+            for cell, text in zip(cells, values):
+                cell.text = text
+            edit_row(table, i, cells)
+        if tables > 1:
+            document.add_paragraph(f"Конец таблицы {table_number + 1}")
+    other = document.add_table(rows=2, cols=2)
+    other.cell(0, 0).text = "Без заголовков"
+    document.save(file_path)
+
+def python_docx_rows(file_path):
+    return [
+        (table_index, [cell.text for cell in row.cells])
+        for table_index, table in enumerate(Document(file_path).tables)
+        for row in table.rows
+    ]
+
+def timed(parser, file_path, repeat):
+    best = None
+    for _ in range(repeat):
+        file_data = defaultdict(float)
+        start = time.perf_counter()
+        parser(file_path, file_data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, dict(file_data)
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=5000, help="число строк в таблице")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="число повторов (берется лучшее время)")
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, "журнал.docx")
+        make_docx(file_path, args.rows)
+
+        if list(iter_docx_rows(file_path)) != python_docx_rows(file_path):
+            raise SystemExit("Строки таблиц не совпадают с python-docx!")
+        docx_time, docx_data = timed(parse_docx, file_path, args.repeat)
+        stream_time, stream_data = timed(parse_docx_stream, file_path, args.repeat)
+        if docx_data != stream_data:
+            raise SystemExit("Итоговые длины не совпадают с python-docx!")
+
+    print(f"Строк в таблице: {args.rows}")
+    print(f"python-docx: {docx_time:.3f} с")
+    print(f"stream:      {stream_time:.3f} с")
+    print(f"Ускорение: x{docx_time / stream_time:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Микро-бенчмарк классификации материалов: строк/сек для старого каскада re.search
+(шаблоны-строки, которые пересобирались на каждой строке), для таблицы правил material_rules
+и для нее же с LRU-кэшем результатов (memoized_classifier).
+Запуск: python -m benchmarks.bench_rules --rows 200000
+"""
+import re
+import time
+import random
+import argparse
+from material_rules import classify_material, memoized_classifier
+
+SAMPLE_NAMES = [
+    "Арматура A500С d12 L=2500", "A400 диаметр 10, L = 1200", "а500с ⌀16,5 L=900",
+    "Уголок 50x5 L=1200", "Профиль 80 x 6 L = 3000", "Скоба 40х4х2 L=150",
+    "Полоса 40х4", "Пластина 100x10x5", "Труба 57x3,5",
+    "Швеллер 12", "Болт М12", "Гайка", "Шайба плоская", "Прокладка резиновая по месту",
+    "Хомут крепежный оцинкованный для труб с резиновым уплотнителем, комплект",
+]
+
+def legacy_classify(search_text, has_length_column):
+    rebar_pattern = r'[АаAa][54]00[СсСc]?.*?(?:диаметр|d|D|⌀|ø)\s*(\d+(?:,\d+)?).*?L\s*=\s*(\d+)'
+    profile_with_l_pattern = r'(\d+(?:,\d+)?(?:\s*[хx]\s*\d+(?:,\d+)?){1,2}).*?L\s*=\s*(\d+)'
+    standard_profile_pattern = r'(\d+(?:,\d+)?(?:\s*[хx]\s*\d+(?:,\d+)?){1,2})'
+
+    rebar_match = re.search(rebar_pattern, search_text, re.IGNORECASE)
+    if rebar_match:
+        return 'rebar', f"Арматура d {rebar_match.group(1).replace(',', '.')}", float(rebar_match.group(2))
+    profile_l_match = re.search(profile_with_l_pattern, search_text, re.IGNORECASE)
+    if profile_l_match:
+        return 'profile_with_l', profile_l_match.group(1).replace(',', '.').replace(' ', ''), float(profile_l_match.group(2))
+    if has_length_column:
+        profile_std_match = re.search(standard_profile_pattern, search_text)
+        if profile_std_match:
+            return 'standard_profile', profile_std_match.group(1).replace(',', '.').replace(' ', ''), None
+    return None
+
+def make_rows(count, seed=0):
+    rnd = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        name = rnd.choice(SAMPLE_NAMES)
+        if rnd.random() < 0.2:
+            name += " " + "по ГОСТ 5781-82 с антикоррозионным покрытием " * rnd.randint(1, 4)
+        rows.append((name + " " + rnd.choice(["", "Ст3", "C245"]), rnd.random() < 0.8))
+    return rows
+
+def measure(classify, rows):
+    start = time.perf_counter()
+    results = [classify(text, has_length_column) for text, has_length_column in rows]
+    return len(rows) / (time.perf_counter() - start), results
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=200000, help="число синтетических строк")
+    arg_parser.add_argument("--memo-size", type=int, default=100000, help="размер LRU-кэша классификации")
+    args = arg_parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    legacy_speed, legacy_results = measure(legacy_classify, rows)
+    rules_speed, rules_results = measure(classify_material, rows)
+    memo = memoized_classifier(args.memo_size)
+    memo_speed, memo_results = measure(memo, rows)
+    if legacy_results != rules_results or memo_results != rules_results:
+        raise SystemExit("Результаты классификации не совпадают со старым каскадом!")
+
+    print(f"Строк: {len(rows)}")
+    print(f"До (re.search по строкам-шаблонам): {legacy_speed:,.0f} строк/сек")
+    print(f"После (таблица правил):             {rules_speed:,.0f} строк/сек")
+    print(f"Ускорение: x{rules_speed / legacy_speed:.2f}")
+    info = memo.cache_info()
+    print(f"С кэшем ({args.memo_size} текстов):        {memo_speed:,.0f} строк/сек, "
+          f"попаданий {info.hits / (info.hits + info.misses):.0%}, ускорение x{memo_speed / legacy_speed:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Бенчмарк по этапам обработки на синтетическом архиве (benchmarks.corpus):
+поиск файлов, find_columns_indices, parse_xlsx, parse_docx (оба способа), process_row,
+агрегация результатов, вывод отчета и полный запуск run_analysis.
+Результаты пишутся в JSON; с --baseline печатается сравнение с прошлым результатом.
+Запуск: python -m benchmarks.bench_stages --files 40 --rows 300 --output bench.json
+"""
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tempfile
+from collections import defaultdict
+import parser_engine
+from parser_engine import (
+    PARSER_VERSION, find_files, find_columns_indices, parse_xlsx, parse_docx, parse_docx_stream,
+    process_row, natural_sort_key, log_report, run_analysis, default_workers,
+)
+from aggregation_store import AggregationStore
+from benchmarks.corpus import generate_corpus, journal_header, journal_row
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def stage(results, name, function, items):
+    """Выполняет этап и записывает время; items — число обработанных единиц (файлов, строк...)."""
+    seconds, result = timed(function)
+    results[name] = {
+        'seconds': round(seconds, 6),
+        'items': items,
+        'items_per_second': round(items / seconds, 1) if seconds > 0 else None,
+    }
+    return result
+
+def parse_all(parser, paths):
+    file_results = {}
+    for path in paths:
+        file_data = defaultdict(float)
+        parser(path, file_data, lambda message: None)
+        file_results[path] = file_data
+    return file_results
+
+def run_stages(root, rows_per_file, workers, seed=0):
+    results = {}
+    all_files = stage(results, 'discovery', lambda: find_files(root), 0)
+    results['discovery']['items'] = len(all_files)
+    xlsx_files = [p for p in all_files if p.lower().endswith('.xlsx')]
+    docx_files = [p for p in all_files if p.lower().endswith('.docx')]
+
+    header = journal_header()
+    header_rounds = 20000
+    column_indices = stage(results, 'find_columns_indices', lambda: [find_columns_indices(header) for _ in range(header_rounds)][-1], header_rounds)
+
+    xlsx_results = stage(results, 'parse_xlsx', lambda: parse_all(parse_xlsx, xlsx_files), len(xlsx_files))
+    stage(results, 'parse_docx[python-docx]', lambda: parse_all(parse_docx, docx_files), len(docx_files))
+    docx_results = stage(results, 'parse_docx[stream]', lambda: parse_all(parse_docx_stream, docx_files), len(docx_files))
+
+    rnd = random.Random(seed)
+    rows = [[str(v) for v in journal_row(rnd, i)] for i in range(len(all_files) * rows_per_file)]
+    def process_rows():
+        file_data = defaultdict(float)
+        for row in rows:
+            process_row(row, column_indices, file_data)
+        return file_data
+    stage(results, 'process_row', process_rows, len(rows))
+
+    file_results = {**xlsx_results, **docx_results}
+    def aggregate():
+        store = AggregationStore(natural_sort_key)
+        for path, file_data in file_results.items():
+            store.add_file(path, file_data)
+        return store
+    store = stage(results, 'aggregation', aggregate, len(file_results))
+    stage(results, 'report', lambda: log_report(store, lambda message: None), len(store))
+
+    stage(results, f'run_analysis[workers={workers}]',
+          lambda: run_analysis(root, lambda message: None, workers), len(all_files))
+    return results
+
+def print_comparison(results, baseline):
+    print(f"\n{'Этап':<32}{'было, с':>12}{'стало, с':>12}{'изменение':>12}")
+    for name, current in results['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if not previous or not previous['seconds']:
+            print(f"{name:<32}{'—':>12}{current['seconds']:>12.4f}{'':>12}")
+            continue
+        change = (current['seconds'] / previous['seconds'] - 1) * 100
+        print(f"{name:<32}{previous['seconds']:>12.4f}{current['seconds']:>12.4f}{change:>+11.1f}%")
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--files", type=int, default=40, help="число журналов в архиве")
+    arg_parser.add_argument("--rows", type=int, default=300, help="строк в каждом журнале")
+    arg_parser.add_argument("--workers", type=int, default=default_workers(), help="процессов для полного запуска")
+    arg_parser.add_argument("--corpus", help="готовая папка с архивом (по умолчанию создается временная)")
+    arg_parser.add_argument("--output", help="куда записать результаты в JSON (по умолчанию — только на экран)")
+    arg_parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = args.corpus
+        if root is None:
+            root = tmp_dir
+            generate_corpus(root, args.files, args.rows, seed=args.seed)
+        stages = run_stages(root, args.rows, args.workers, args.seed)
+
+    results = {
+        'parser_version': PARSER_VERSION,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {'files': args.files, 'rows': args.rows, 'workers': args.workers, 'seed': args.seed,
+                   'corpus': args.corpus, 'docx_backend': parser_engine.DOCX_BACKEND},
+        'stages': stages,
+    }
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            print_comparison(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Холодный запуск: время импорта parser_engine и пакетного запуска на пустой папке в новом процессе,
+а также какие библиотеки форматов при этом загружены (их не должно быть, пока не встретился файл формата).
+Запуск: python -m benchmarks.bench_startup --runs 10
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORMAT_MODULES = ['openpyxl', 'docx', 'olefile', 'win32com', 'pythoncom', 'tkinter']
+
+def cold_run(code, runs):
+    """Медиана времени (мс) выполнения code в новом интерпретаторе."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 1)
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--runs", type=int, default=10)
+    args = arg_parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as empty_dir:
+        check_modules = (
+            "import sys, parser_engine; parser_engine.run_analysis(%r, log=lambda m: None, max_workers=1); "
+            "print(' '.join(m for m in %r if m in sys.modules))" % (empty_dir, FORMAT_MODULES)
+        )
+        loaded = subprocess.run([sys.executable, '-c', check_modules], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.split()
+        results = {
+            'python_ms': cold_run("pass", args.runs),
+            'import_parser_engine_ms': cold_run("import parser_engine", args.runs),
+            'empty_run_ms': cold_run(f"import parser_engine; parser_engine.main([{empty_dir!r}, '--no-cache'])", args.runs),
+            'format_modules_loaded': loaded,
+        }
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Сверка прямого чтения .doc (doc_binary.iter_doc_rows) с эталоном.
+Фикстура benchmarks/fixtures/journal.doc — документ Word 97–2003, сохраненный сторонней программой
+(Aspose.Words) из benchmarks/fixtures/journal.docx, который строит make_fixture_docx: две таблицы журнала
+(с объединенными ячейками и многострочной ячейкой) и таблица без заголовков. Проверяется, что строки таблиц
+.doc совпадают со строками исходного .docx (docx_stream.iter_docx_rows), а итоговые длины — с parse_docx_stream,
+и что копия фикстуры с флагом быстрого сохранения (fComplex) отклоняется с DocFormatError.
+Если установлен LibreOffice, фикстура и переданные в командной строке .doc файлы дополнительно
+сравниваются с их конвертацией в .docx (как при --doc-backend libreoffice).
+Запуск: python -m benchmarks.check_doc_binary [журнал.doc ...]
+"""
+import os
+import sys
+import shutil
+import struct
+import argparse
+import tempfile
+import subprocess
+from collections import defaultdict
+from docx_stream import iter_docx_rows
+from doc_binary import iter_doc_rows, DocFormatError, _FIB_FLAGS_OFFSET, _FIB_COMPLEX
+from parser_engine import parse_doc_binary, parse_docx_stream
+from benchmarks.bench_docx import make_docx
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURE_DOC = os.path.join(FIXTURES_DIR, 'journal.doc')
+FIXTURE_DOCX = os.path.join(FIXTURES_DIR, 'journal.docx')
+
+def fixture_edge_cases(table, i, cells):
+    if i == 3:
+        cells[2].text = "Ст3\nоцинк."  # перенос строки в ячейке
+        cells[1].add_paragraph("по ГОСТ 8509")  # второй абзац в ячейке
+    elif i == 5:
+        cells[1].text = "Уголок 50x5 L=1200"
+        cells[2].merge(cells[3])  # объединение по горизонтали: количество — в объединенной ячейке
+    elif i == 7:
+        cells[1].merge(table.cell(i, 1))  # объединение с ячейкой строки выше (по вертикали)
+
+def make_fixture_docx(file_path, rows=12, seed=0):
+    """Исходный документ фикстуры (в .doc его переводит сторонняя программа, см. описание модуля)."""
+    make_docx(file_path, rows, seed, title="Журнал заготовки материалов", tables=2, quantities=(1, 5),
+              edit_row=fixture_edge_cases)
+
+def normalized(rows):
+    # Значения ячеек .doc обрезаются по краям (как и при чтении через MS Word), .docx — нет
+    return [(table_index, [value.strip() for value in values]) for table_index, values in rows]
+
+def totals(parser, file_path):
+    file_data = defaultdict(float)
+    messages = []
+    parser(file_path, file_data, messages.append)
+    if messages:
+        raise SystemExit(f"{os.path.basename(file_path)}: {' '.join(messages)}")
+    return dict(file_data)
+
+def libreoffice_docx(file_path, out_dir):
+    soffice = shutil.which('soffice') or shutil.which('libreoffice')
+    if soffice is None: return None
+    subprocess.run([soffice, '--headless', '--convert-to', 'docx', '--outdir', out_dir, os.path.abspath(file_path)],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(file_path))[0] + '.docx')
+
+def compare(doc_path, docx_path, reference):
+    """Сравнивает строки и итоги .doc с .docx; возвращает список расхождений."""
+    problems = []
+    doc_rows, docx_rows = normalized(iter_doc_rows(doc_path)), normalized(iter_docx_rows(docx_path))
+    if doc_rows != docx_rows:
+        differing = [i for i, (a, b) in enumerate(zip(doc_rows, docx_rows)) if a != b]
+        first = differing[0] if differing else min(len(doc_rows), len(docx_rows))
+        problems.append(f"строки таблиц не совпадают с {reference} ({len(doc_rows)} и {len(docx_rows)} строк, "
+                        f"первое расхождение в строке {first}: "
+                        f"{doc_rows[first] if first < len(doc_rows) else '-'} / {docx_rows[first] if first < len(docx_rows) else '-'})")
+    if totals(parse_doc_binary, doc_path) != totals(parse_docx_stream, docx_path):
+        problems.append(f"итоговые длины не совпадают с {reference}")
+    return problems
+
+def fast_saved_problems(out_dir):
+    """Копия фикстуры с выставленным флагом fComplex должна отклоняться, а не читаться по неполной таблице фрагментов."""
+    import olefile
+    file_path = os.path.join(out_dir, 'fast_saved.doc')
+    shutil.copyfile(FIXTURE_DOC, file_path)
+    with olefile.OleFileIO(file_path, write_mode=True) as ole:
+        word_stream = bytearray(ole.openstream('WordDocument').read())
+        flags = struct.unpack_from('<H', word_stream, _FIB_FLAGS_OFFSET)[0]
+        struct.pack_into('<H', word_stream, _FIB_FLAGS_OFFSET, flags | _FIB_COMPLEX)
+        ole.write_stream('WordDocument', bytes(word_stream))
+    try:
+        list(iter_doc_rows(file_path))
+    except DocFormatError:
+        return []
+    return ["документ с быстрым сохранением прочитан без ошибки DocFormatError"]
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("files", nargs='*', help="дополнительные .doc для сверки с конвертацией LibreOffice")
+    args = arg_parser.parse_args(argv)
+
+    problems = [f"{FIXTURE_DOC}: {problem}" for problem in compare(FIXTURE_DOC, FIXTURE_DOCX, "исходного .docx")]
+    print(f"{os.path.basename(FIXTURE_DOC)}: {len(list(iter_doc_rows(FIXTURE_DOC)))} строк таблиц, "
+          f"итог {totals(parse_doc_binary, FIXTURE_DOC)}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        problems += [f"{FIXTURE_DOC}: {problem}" for problem in fast_saved_problems(out_dir)]
+        for doc_path in [FIXTURE_DOC] + args.files:
+            converted = libreoffice_docx(doc_path, out_dir)
+            if converted is None:
+                print("LibreOffice не найден — сверка с конвертацией пропущена.")
+                break
+            problems += [f"{doc_path}: {problem}" for problem in compare(doc_path, converted, "конвертации LibreOffice")]
+            print(f"{doc_path}: сверено с конвертацией LibreOffice")
+    for problem in problems:
+        print(f"ОШИБКА {problem}", file=sys.stderr)
+    if not problems:
+        print("Строки таблиц и итоговые длины совпадают.")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""
+Проверка sharding.py local с настройками по умолчанию на синтетическом архиве (benchmarks.corpus):
+все шарды завершаются (дважды подряд — второй раз из кэшей шардов), а сведенный итог совпадает
+с итогом обычного запуска run_analysis.
+Запуск: python -m benchmarks.check_sharding --files 60 --shards 4
+"""
+import os
+import sys
+import glob
+import argparse
+import tempfile
+import subprocess
+import sharding
+from parser_engine import run_analysis
+from benchmarks.corpus import generate_corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_local(corpus_dir, output_dir, shards):
+    """sharding.py local в отдельном процессе; возвращает (код выхода, вывод)."""
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, 'sharding.py'), 'local', corpus_dir, '--shards', str(shards), '--output-dir', output_dir],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    return completed.returncode, completed.stdout + completed.stderr
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--files", type=int, default=60)
+    arg_parser.add_argument("--rows", type=int, default=100)
+    arg_parser.add_argument("--shards", type=int, default=4)
+    args = arg_parser.parse_args(argv)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = os.path.join(work_dir, 'corpus')
+        output_dir = os.path.join(work_dir, 'parts')
+        generate_corpus(corpus_dir, args.files, args.rows)
+        expected = run_analysis(corpus_dir, log=lambda message: None, max_workers=1).grand_total()
+        for attempt in ('без кэша', 'из кэшей шардов'):
+            returncode, output = run_local(corpus_dir, output_dir, args.shards)
+            partials = sorted(glob.glob(os.path.join(output_dir, 'part-*.json')))
+            if returncode != 0 or len(partials) != args.shards:
+                failures.append(f"{attempt}: код {returncode}, частичных результатов {len(partials)} из {args.shards}\n{output}")
+                continue
+            merged = sharding.merge_partials(partials, log=lambda message: failures.append(f"{attempt}: {message}"))
+            if merged.grand_total() != expected:
+                failures.append(f"{attempt}: сведенный итог отличается от обычного запуска")
+            print(f"{attempt}: {args.shards} шардов завершены, итог совпадает")
+    for failure in failures:
+        print(f"ОШИБКА {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+Проверка WorkerPool на фиктивном бэкенде (без MS Word и реальных файлов, работает и на Linux):
+плановый перезапуск после max_tasks файлов и при превышении max_memory_mb, принудительное завершение
+по task_timeout (вместе с внешней программой бэкенда и его временной папкой), перезапуск после падения процесса,
+исключение в parse, ошибка запуска бэкенда (open), ошибка создания процесса и сбой управляющего потока пула.
+Вместо пути к файлу передается команда для FakeBackend: "ok:имя", "sleep:секунды", "crash", "raise".
+Запуск: python -m benchmarks.check_worker_pool
+"""
+import os
+import sys
+import time
+import errno
+import shutil
+import tempfile
+import functools
+import subprocess
+import multiprocessing
+from worker_pool import WorkerPool
+
+TASK_TIMEOUT = 1.0
+
+class FakeBackend:
+    """Бэкенд для WorkerPool, поведение которого задается "путем" файла."""
+
+    def __init__(self, fail_open=False, helper=False):
+        self.fail_open = fail_open
+        self.helper = helper
+
+    def open(self):
+        if self.fail_open:
+            raise RuntimeError("фиктивный бэкенд не запускается")
+        if self.helper:
+            # Как WINWORD.EXE: внешняя программа, которая переживет убитый процесс-обработчик
+            self.helper_process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'], start_new_session=True)
+            self.work_dir = tempfile.mkdtemp(prefix='check_worker_pool_')
+
+    def external_resources(self):
+        if not self.helper: return [], []
+        return [self.helper_process.pid], [self.work_dir]
+
+    def parse(self, file_path):
+        command, _, argument = file_path.partition(':')
+        if command == 'sleep':
+            time.sleep(float(argument))
+        elif command == 'crash':
+            os._exit(3)
+        elif command == 'raise':
+            raise ValueError("фиктивная ошибка разбора")
+        return {'pid': os.getpid()}, [], {'file': file_path}, None, None
+
+    def close(self):
+        if self.helper:
+            self.helper_process.kill()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+class FailingContext:
+    """multiprocessing-контекст, в котором создание процесса (или очереди) завершается ошибкой."""
+
+    def __init__(self, process_error=None, queue_error=None):
+        self.context = multiprocessing.get_context()
+        self.process_error = process_error
+        self.queue_error = queue_error
+
+    def Process(self, *args, **kwargs):
+        if self.process_error: raise self.process_error
+        return self.context.Process(*args, **kwargs)
+
+    def Queue(self):
+        if self.queue_error: raise self.queue_error
+        return self.context.Queue()
+
+    def Pipe(self, duplex):
+        return self.context.Pipe(duplex)
+
+def process_exists(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'  # зомби уже завершен
+    except OSError:
+        pass
+    try: os.kill(pid, 0)
+    except OSError: return False
+    return True
+
+def run(pool, tasks, timeout=30):
+    """Результаты задач tasks в порядке отправки."""
+    futures = [pool.submit(task) for task in tasks]
+    return [future.result(timeout=timeout) for future in futures]
+
+def failed(result):
+    # Неразобранный файл: нет метрик, в сообщениях — причина
+    return result[3] is None and len(result[2]) == 1
+
+def check_recycle_after_max_tasks():
+    with WorkerPool(FakeBackend, 1, max_tasks=2) as pool:
+        results = run(pool, [f"ok:{i}" for i in range(5)])
+    pids = [result[1]['pid'] for result in results]
+    assert not any(map(failed, results)), results
+    assert pool.restarts == 2 and len(set(pids)) == 3, (pool.restarts, pids)
+    assert pids[0] == pids[1] != pids[2] == pids[3] != pids[4], pids
+
+def check_recycle_on_memory_limit():
+    with WorkerPool(FakeBackend, 1, max_memory_mb=1) as pool:
+        results = run(pool, ["ok:1", "ok:2", "ok:3"])
+    assert not any(map(failed, results)), results
+    assert pool.restarts == 3 and len({result[1]['pid'] for result in results}) == 3, pool.restarts
+
+def check_timeout_kill():
+    with WorkerPool(FakeBackend, 1, task_timeout=TASK_TIMEOUT) as pool:
+        started = time.monotonic()
+        slow, after = run(pool, [f"sleep:{TASK_TIMEOUT * 20}", "ok:after"])
+        elapsed = time.monotonic() - started
+    assert failed(slow) and "превышено время" in slow[2][0], slow
+    assert not failed(after), after
+    assert pool.timeouts == 1 and elapsed < TASK_TIMEOUT * 10, (pool.timeouts, elapsed)
+
+def check_timeout_releases_external():
+    with WorkerPool(functools.partial(FakeBackend, helper=True), 1, task_timeout=TASK_TIMEOUT) as pool:
+        first = run(pool, ["ok:first"])[0]
+        # pid и папку бэкенда процесс сообщает пулу сразу после open()
+        (worker,) = pool.workers.values()
+        (helper_pid,), (work_dir,) = worker.external
+        slow = run(pool, [f"sleep:{TASK_TIMEOUT * 20}"])[0]
+    assert not failed(first) and failed(slow), (first, slow)
+    deadline = time.monotonic() + 5
+    while process_exists(helper_pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not process_exists(helper_pid), f"внешняя программа {helper_pid} не завершена"
+    assert not os.path.exists(work_dir), f"временная папка {work_dir} не удалена"
+
+def check_crash_restart():
+    with WorkerPool(FakeBackend, 1) as pool:
+        before, crashed, after = run(pool, ["ok:before", "crash", "ok:after"])
+    assert failed(crashed) and "аварийно" in crashed[2][0], crashed
+    assert not failed(before) and not failed(after), (before, after)
+    assert pool.crashes == 1 and before[1]['pid'] != after[1]['pid'], pool.crashes
+
+def check_parse_exception():
+    with WorkerPool(FakeBackend, 1) as pool:
+        before, raised, after = run(pool, ["ok:before", "raise", "ok:after"])
+    assert failed(raised) and "ValueError" in raised[2][0], raised
+    # Исключение в parse не роняет процесс: он продолжает разбирать следующие файлы
+    assert before[1]['pid'] == after[1]['pid'] and pool.crashes == 0, (before, after, pool.crashes)
+
+def check_open_failure():
+    with WorkerPool(functools.partial(FakeBackend, fail_open=True), 2) as pool:
+        results = run(pool, ["ok:1", "ok:2", "ok:3"])
+    assert all(failed(result) and "не удалось запустить обработчик" in result[2][0] for result in results), results
+    # Процесс может не запуститься и до получения задачи — такие запуски тоже считаются
+    assert pool.crashes >= len(results), pool.crashes
+
+def check_process_start_failure():
+    pool = WorkerPool(FakeBackend, 2, mp_context=FailingContext(process_error=OSError(errno.EAGAIN, "Resource temporarily unavailable")))
+    results = run(pool, ["ok:1", "ok:2"], timeout=10)
+    pool.shutdown()
+    assert all(failed(result) and "не удалось запустить процесс-обработчик" in result[2][0] for result in results), results
+
+def check_manager_failure():
+    pool = WorkerPool(FakeBackend, 1, mp_context=FailingContext(queue_error=ValueError("сбой")))
+    results = run(pool, ["ok:1", "ok:2"], timeout=10)
+    assert all(failed(result) and "пул остановлен" in result[2][0] for result in results), results
+    try:
+        pool.submit("ok:3")
+    except RuntimeError:
+        return
+    raise AssertionError("пул со сбоем управляющего потока принимает задачи")
+
+CHECKS = [
+    check_recycle_after_max_tasks, check_recycle_on_memory_limit, check_timeout_kill, check_timeout_releases_external,
+    check_crash_restart, check_parse_exception, check_open_failure, check_process_start_failure, check_manager_failure,
+]
+
+def main():
+    failures = 0
+    for check in CHECKS:
+        started = time.perf_counter()
+        try:
+            check()
+            status = "ok"
+        except AssertionError as e:
+            failures += 1
+            status = f"ОШИБКА {e}"
+        print(f"{check.__name__}: {status} ({time.perf_counter() - started:.2f} с)")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Генератор синтетического архива журналов (.xlsx и .docx) для бенчмарков.
+Заголовки таблиц строятся из ключевых слов конфигурации, строки — арматура ("A500С d12 L=2500"),
+профили с длиной в тексте ("50x5 L=1200"), профили с длиной в столбце, строки-продолжения
+с пустым наименованием и исключаемые строки с EXCLUDE_KEYWORD ("лист").
+Запуск: python -m benchmarks.corpus <папка> --files 100 --rows 500
+"""
+import os
+import random
+import argparse
+import openpyxl
+from docx import Document
+from parser_engine import (
+    NAME_KEYWORDS, MATERIAL_KEYWORDS, QUANTITY_KEYWORDS, LENGTH_KEYWORDS, EXCLUDE_KEYWORD, FILENAME_FILTER_KEYWORD,
+)
+
+REBAR_CLASSES = ['A500С', 'А500C', 'A400', 'а500с']
+DIAMETER_MARKS = ['d', 'D', '⌀', 'диаметр ']
+PROFILE_NAMES = ['Уголок', 'Полоса', 'Пластина', 'Труба']
+OTHER_NAMES = ['Болт М12', 'Гайка М12', 'Швеллер 12П', 'Анкер']
+STEEL_GRADES = ['', 'Ст3', 'C245', 'C255']
+
+def journal_header():
+    return ['Поз.', NAME_KEYWORDS[0].capitalize(), MATERIAL_KEYWORDS[0].capitalize(),
+            f"{QUANTITY_KEYWORDS[0].capitalize()}., {QUANTITY_KEYWORDS[1]}", f"{LENGTH_KEYWORDS[0].capitalize()}а, мм"]
+
+def journal_row(rnd, position):
+    """Одна строка таблицы журнала: [позиция, наименование, материал, количество, длина]."""
+    kind = rnd.random()
+    quantity = rnd.randint(1, 40)
+    length = rnd.choice([600, 1200, 2500, 3000, 6000, 11700])
+    if kind < 0.35:
+        name = f"{rnd.choice(REBAR_CLASSES)} {rnd.choice(DIAMETER_MARKS)}{rnd.choice([8, 10, 12, 16, 20, 25])} L={length}"
+        return [position, name, '', quantity, '']
+    if kind < 0.55:
+        name = f"{rnd.choice(PROFILE_NAMES)} {rnd.choice([40, 50, 63, 75])}{rnd.choice(['x', 'х'])}{rnd.choice([4, 5, 6])} L={length}"
+        return [position, name, rnd.choice(STEEL_GRADES), quantity, '']
+    if kind < 0.75:
+        name = f"{rnd.choice(PROFILE_NAMES)} {rnd.choice([40, 57, 100])}x{rnd.choice(['3,5', 4, 10])}"
+        return [position, name, rnd.choice(STEEL_GRADES), quantity, length]
+    if kind < 0.85:
+        return [position, '', '', quantity, length]  # продолжение: наименование из предыдущей строки
+    if kind < 0.92:
+        return [position, f"{EXCLUDE_KEYWORD.capitalize()} 10x1500 L={length}", 'C245', quantity, '']
+    return [position, rnd.choice(OTHER_NAMES), '', quantity, '']
+
+def write_xlsx_journal(file_path, rows, rnd):
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([f"{FILENAME_FILTER_KEYWORD.capitalize()} материалов"])
+    sheet.append([])
+    sheet.append(journal_header())
+    for position in range(1, rows + 1):
+        sheet.append(journal_row(rnd, position))
+    workbook.save(file_path)
+
+def write_docx_journal(file_path, rows, rnd):
+    document = Document()
+    document.add_paragraph(f"{FILENAME_FILTER_KEYWORD.capitalize()} материалов")
+    table = document.add_table(rows=1, cols=5)
+    for cell, text in zip(table.rows[0].cells, journal_header()):
+        cell.text = text
+    for position in range(1, rows + 1):
+        for cell, value in zip(table.add_row().cells, journal_row(rnd, position)):
+            cell.text = str(value)
+    document.save(file_path)
+
+def generate_corpus(root, files=20, rows=200, folders=5, docx_share=0.3, seed=0):
+    """
+    Создает в root папки "Объект N" с журналами (доля .docx — docx_share) и несколько посторонних файлов.
+    Возвращает список путей созданных журналов.
+    """
+    rnd = random.Random(seed)
+    created = []
+    for i in range(files):
+        folder = os.path.join(root, f"Объект {i % folders + 1}")
+        os.makedirs(folder, exist_ok=True)
+        is_docx = rnd.random() < docx_share
+        file_path = os.path.join(folder, f"{FILENAME_FILTER_KEYWORD.capitalize()} {i + 1}.{'docx' if is_docx else 'xlsx'}")
+        (write_docx_journal if is_docx else write_xlsx_journal)(file_path, rows, rnd)
+        created.append(file_path)
+    for folder_index in range(folders):
+        folder = os.path.join(root, f"Объект {folder_index + 1}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "Пояснительная записка.txt"), 'w', encoding='utf-8') as f:
+            f.write("не журнал")
+    return created
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("root", help="папка, в которой создать архив")
+    arg_parser.add_argument("--files", type=int, default=20, help="число журналов")
+    arg_parser.add_argument("--rows", type=int, default=200, help="строк в каждом журнале")
+    arg_parser.add_argument("--folders", type=int, default=5, help="число папок объектов")
+    arg_parser.add_argument("--docx-share", type=float, default=0.3, help="доля журналов в формате .docx")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args(argv)
+    created = generate_corpus(args.root, args.files, args.rows, args.folders, args.docx_share, args.seed)
+    print(f"Создано журналов: {len(created)} в {args.root}")
+
+if __name__ == "__main__":
+    main()
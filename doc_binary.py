@@ -0,0 +1,289 @@
+import re
+import struct
+from bisect import bisect_left, bisect_right
+
+# Чтение таблиц из двоичного формата Word 97–2003 (.doc) без MS Word.
+# Из OLE-контейнера берутся потоки WordDocument и 0Table/1Table. Текст собирается по таблице
+# фрагментов (Clx/PlcPcd), а границы ячеек и строк определяются по символу \x07 и свойствам
+# абзаца (sprmPFInTable / sprmPFTtp) из страниц PapxFkp. Из свойств конца строки (sprmTDefTable,
+# sprmTVertMerge, sprmTMerge) берутся границы и объединения ячеек, чтобы строки выдавались по сетке
+# таблицы так же, как их читает docx_stream (объединенная ячейка повторяется в каждом своем столбце).
+# Вложенные таблицы и свойства абзацев из самих фрагментов (Prm) не учитываются. Документы с быстрым
+# сохранением (флаг fComplex) не читаются: их текст и свойства могут быть дописаны в конец потока не по порядку.
+
+_FIB_FLAGS_OFFSET = 0x0A
+_FIB_WHICH_TABLE_STREAM = 0x0200
+_FIB_COMPLEX = 0x0004
+_FIB_ENCRYPTED = 0x0100
+_FIB_LW_CCP_TEXT = 3
+_FIB_FCLCB_PLCF_BTE_PAPX = 13
+_FIB_FCLCB_CLX = 33
+_FKP_SIZE = 512
+_SPRM_P_F_IN_TABLE = 0x2416
+_SPRM_P_F_TTP = 0x2417
+_SPRM_T_DEF_TABLE = 0xD608
+_SPRM_T_VERT_MERGE = 0xD62B
+_SPRM_T_MERGE = 0x5624
+_SPRM_P_HUGE_PAPX = 0x6646
+_TC80_SIZE = 20
+_VERT_MERGE_CONTINUE = 1  # ячейка продолжает объединение с ячейкой выше, ее текст не показывается
+_SPRM_OPERAND_SIZES = {0: 1, 1: 1, 2: 2, 3: 4, 4: 2, 5: 2, 7: 3}
+
+_CELL_MARK = '\x07'
+_PARAGRAPH_ENDS_RE = re.compile('[\r\x07]')
+_FIELD_RE = re.compile('\x13[^\x13\x14\x15]*(?:\x14([^\x13\x14\x15]*))?\x15')
+_CELL_TRANSLATION = str.maketrans({'\x1e': '-', '\x1f': None, '\x01': None, '\x08': None, '\x0b': '\n'})
+
+class DocFormatError(Exception):
+    pass
+
+def read_doc_streams(file_path):
+    """Возвращает байты потоков WordDocument, таблицы (0Table или 1Table) и Data (b'', если его нет)."""
+    try:
+        import olefile  # Импортируется при первом .doc, чтобы не замедлять запуск
+    except ImportError:  # Без olefile прямое чтение .doc недоступно (остается MS Word через COM)
+        raise DocFormatError("необходима библиотека olefile (pip install olefile)")
+    with olefile.OleFileIO(file_path) as ole:
+        if not ole.exists('WordDocument'):
+            raise DocFormatError("нет потока WordDocument — это не документ Word 97–2003")
+        word_stream = ole.openstream('WordDocument').read()
+        flags = struct.unpack_from('<H', word_stream, _FIB_FLAGS_OFFSET)[0]
+        if flags & _FIB_ENCRYPTED:
+            raise DocFormatError("документ зашифрован")
+        if flags & _FIB_COMPLEX:
+            raise DocFormatError("документ сохранен в режиме быстрого сохранения — пересохраните его полностью")
+        table_name = '1Table' if flags & _FIB_WHICH_TABLE_STREAM else '0Table'
+        if not ole.exists(table_name):
+            raise DocFormatError(f"нет потока {table_name}")
+        table_stream = ole.openstream(table_name).read()
+        data_stream = ole.openstream('Data').read() if ole.exists('Data') else b''
+    return word_stream, table_stream, data_stream
+
+def _read_fib(word_stream):
+    if struct.unpack_from('<H', word_stream, 0)[0] != 0xA5EC:
+        raise DocFormatError("неверная сигнатура FIB")
+    offset = 32
+    csw = struct.unpack_from('<H', word_stream, offset)[0]
+    offset += 2 + csw * 2
+    cslw = struct.unpack_from('<H', word_stream, offset)[0]
+    lw_offset = offset + 2
+    offset = lw_offset + cslw * 4
+    fclcb_offset = offset + 2
+
+    def fc_lcb(index):
+        return struct.unpack_from('<II', word_stream, fclcb_offset + index * 8)
+
+    ccp_text = struct.unpack_from('<i', word_stream, lw_offset + _FIB_LW_CCP_TEXT * 4)[0]
+    return ccp_text, fc_lcb(_FIB_FCLCB_CLX), fc_lcb(_FIB_FCLCB_PLCF_BTE_PAPX)
+
+def _read_pieces(table_stream, fc_clx, lcb_clx):
+    """Таблица фрагментов: список (cp начала, cp конца, fc, сжатый ли фрагмент)."""
+    pos, end = fc_clx, fc_clx + lcb_clx
+    while pos < end and table_stream[pos] == 0x01:  # Prc — пропускаем
+        pos += 3 + struct.unpack_from('<h', table_stream, pos + 1)[0]
+    if pos >= end or table_stream[pos] != 0x02:
+        raise DocFormatError("не найдена таблица фрагментов (PlcPcd)")
+    lcb = struct.unpack_from('<I', table_stream, pos + 1)[0]
+    pos += 5
+    count = (lcb - 4) // 12
+    cps = struct.unpack_from(f'<{count + 1}i', table_stream, pos)
+    pieces = []
+    for i in range(count):
+        fc = struct.unpack_from('<I', table_stream, pos + (count + 1) * 4 + i * 8 + 2)[0]
+        compressed = bool(fc & 0x40000000)
+        fc &= 0x3FFFFFFF
+        pieces.append((cps[i], cps[i + 1], fc // 2 if compressed else fc, compressed))
+    return pieces
+
+def _read_text(word_stream, pieces, ccp_text):
+    parts = []
+    for cp_start, cp_end, fc, compressed in pieces:
+        if cp_start >= ccp_text: break
+        count = min(cp_end, ccp_text) - cp_start
+        if compressed:
+            parts.append(word_stream[fc:fc + count].decode('cp1252', errors='replace'))
+        else:
+            parts.append(word_stream[fc:fc + count * 2].decode('utf-16-le', errors='replace'))
+    return ''.join(parts)
+
+def _iter_sprms(grpprl):
+    """Выдает (sprm, операнд) из набора свойств grpprl."""
+    pos = 0
+    while pos + 2 <= len(grpprl):
+        sprm = struct.unpack_from('<H', grpprl, pos)[0]
+        pos += 2
+        spra = sprm >> 13
+        if spra == 6:
+            if sprm == _SPRM_T_DEF_TABLE:
+                if pos + 2 > len(grpprl): break
+                pos, size = pos + 2, struct.unpack_from('<H', grpprl, pos)[0] - 1
+            else:
+                if pos >= len(grpprl): break
+                pos, size = pos + 1, grpprl[pos]
+        else:
+            size = _SPRM_OPERAND_SIZES[spra]
+        yield sprm, grpprl[pos:pos + size]
+        pos += size
+
+def _row_definition(operand):
+    """
+    Описание строки из sprmTDefTable: (границы ячеек, объединена ли ячейка с предыдущей,
+    продолжает ли ячейка объединение с ячейкой выше). None, если операнд поврежден.
+    """
+    count = operand[0]
+    tc_offset = 1 + (count + 1) * 2
+    if len(operand) < tc_offset: return None
+    boundaries = struct.unpack_from(f'<{count + 1}h', operand, 1)
+    horizontal, vertical = [False] * count, [False] * count
+    for itc in range(min(count, (len(operand) - tc_offset) // _TC80_SIZE)):
+        tcgrf = struct.unpack_from('<H', operand, tc_offset + itc * _TC80_SIZE)[0]
+        horizontal[itc] = tcgrf & 0x3 >= 2  # horzMerge 2/3 — объединена с предыдущей
+        vertical[itc] = (tcgrf >> 5) & 0x3 == _VERT_MERGE_CONTINUE
+    return boundaries, horizontal, vertical
+
+def _paragraph_properties(grpprl, data_stream):
+    """(абзац в таблице, конец строки таблицы, описание строки или None) по набору свойств абзаца."""
+    in_table = ttp = False
+    row = None
+    for sprm, operand in _iter_sprms(grpprl):
+        if not operand: continue
+        if sprm == _SPRM_P_F_IN_TABLE:
+            in_table = operand[0] != 0
+        elif sprm == _SPRM_P_F_TTP:
+            ttp = operand[0] != 0
+        elif sprm == _SPRM_T_DEF_TABLE:
+            row = _row_definition(operand)
+        elif sprm == _SPRM_T_VERT_MERGE and row is not None and len(operand) >= 2:
+            if operand[0] < len(row[2]):
+                row[2][operand[0]] = operand[1] == _VERT_MERGE_CONTINUE
+        elif sprm == _SPRM_T_MERGE and row is not None and len(operand) >= 2:
+            for itc in range(operand[0] + 1, min(operand[1], len(row[1]))):
+                row[1][itc] = True
+        elif sprm == _SPRM_P_HUGE_PAPX and len(operand) == 4 and data_stream:
+            # Свойства не поместились в PapxFkp (например, строка с большим числом ячеек) — лежат в потоке Data
+            offset = struct.unpack('<I', operand)[0]
+            if offset + 2 > len(data_stream): continue
+            size = struct.unpack_from('<H', data_stream, offset)[0]
+            huge_in_table, huge_ttp, huge_row = _paragraph_properties(data_stream[offset + 2:offset + 2 + size], None)
+            in_table, ttp, row = in_table or huge_in_table, ttp or huge_ttp, huge_row or row
+    return in_table, ttp, row
+
+_NO_PROPERTIES = (False, False, None)
+
+class _ParagraphProperties:
+    """Свойства абзацев (в таблице / конец строки / описание строки) по смещению символа в потоке WordDocument."""
+
+    def __init__(self, word_stream, table_stream, data_stream, fc_bte, lcb_bte):
+        count = (lcb_bte - 4) // 8
+        self.word_stream = word_stream
+        self.data_stream = data_stream
+        self.bte_fcs = struct.unpack_from(f'<{count + 1}I', table_stream, fc_bte) if count > 0 else ()
+        self.bte_pages = [pn & 0x3FFFFF for pn in struct.unpack_from(f'<{count}I', table_stream, fc_bte + (count + 1) * 4)] if count > 0 else []
+        self.fkp_cache = {}
+
+    def _fkp(self, page):
+        fkp = self.fkp_cache.get(page)
+        if fkp is None:
+            data = self.word_stream[page * _FKP_SIZE:(page + 1) * _FKP_SIZE]
+            crun = data[_FKP_SIZE - 1]
+            fcs = struct.unpack_from(f'<{crun + 1}I', data, 0)
+            flags = []
+            for i in range(crun):
+                b_offset = data[(crun + 1) * 4 + i * 13] * 2
+                if b_offset == 0:
+                    flags.append(_NO_PROPERTIES)
+                    continue
+                cb = data[b_offset]
+                if cb:
+                    start, size = b_offset + 1, 2 * cb - 1
+                else:
+                    start, size = b_offset + 2, 2 * data[b_offset + 1]
+                flags.append(_paragraph_properties(data[start + 2:start + size], self.data_stream))  # первые 2 байта — istd
+            fkp = self.fkp_cache[page] = (fcs, flags)
+        return fkp
+
+    def at(self, fc):
+        index = bisect_right(self.bte_fcs, fc) - 1
+        if index < 0 or index >= len(self.bte_pages): return _NO_PROPERTIES
+        fcs, flags = self._fkp(self.bte_pages[index])
+        run = bisect_right(fcs, fc) - 1
+        if run < 0 or run >= len(flags): return _NO_PROPERTIES
+        return flags[run]
+
+def _clean_cell_text(text):
+    previous = None
+    while previous != text:  # вложенные поля раскрываются изнутри наружу
+        previous = text
+        text = _FIELD_RE.sub(lambda match: match.group(1) or '', text)
+    return text.translate(_CELL_TRANSLATION).strip('\r\x07 ').strip()
+
+def _table_values(table_rows):
+    """
+    Выдает значения ячеек строк одной таблицы [(ячейки, описание строки), ...] по сетке таблицы
+    (все границы ячеек ее строк), как docx_stream: ячейка повторяется в каждом столбце сетки, который
+    занимает, объединенная с предыдущей — получает текст предыдущей, продолжение вертикального
+    объединения — текст ячейки выше. Строки без описания (или с другим числом ячеек) выдаются как есть.
+    """
+    columns = sorted({x for _, row in table_rows if row is not None for x in row[0]})
+    row_above = {}
+    for cells, row in table_rows:
+        if row is None or len(row[0]) != len(cells) + 1:
+            row_above = {}
+            yield cells
+            continue
+        boundaries, horizontal, vertical = row
+        values, grid = [], {}
+        text = ''
+        for itc, cell_text in enumerate(cells):
+            offset = bisect_left(columns, boundaries[itc])
+            span = max(1, bisect_left(columns, boundaries[itc + 1]) - offset)
+            if vertical[itc]:
+                text = row_above.get(offset, '')
+            elif not horizontal[itc]:
+                text = cell_text
+            grid[offset] = text
+            values.extend([text] * span)
+        row_above = grid
+        yield values
+
+def iter_doc_rows(file_path):
+    """
+    Перебирает строки таблиц основного текста документа .doc.
+    Выдает кортежи (номер таблицы, список строковых значений ячеек) — так же, как docx_stream.iter_docx_rows.
+    """
+    word_stream, table_stream, data_stream = read_doc_streams(file_path)
+    ccp_text, (fc_clx, lcb_clx), (fc_bte, lcb_bte) = _read_fib(word_stream)
+    pieces = _read_pieces(table_stream, fc_clx, lcb_clx)
+    text = _read_text(word_stream, pieces, ccp_text)
+    properties = _ParagraphProperties(word_stream, table_stream, data_stream, fc_bte, lcb_bte)
+    piece_starts = [piece[0] for piece in pieces]
+
+    def fc_at(cp):
+        cp_start, _, fc, compressed = pieces[bisect_right(piece_starts, cp) - 1]
+        return fc + (cp - cp_start) * (1 if compressed else 2)
+
+    table_index = 0
+    table_rows = []  # строки текущей таблицы: выдаются после ее конца, когда известна сетка
+    row_cells = []
+    cell_parts = []
+    paragraph_start = 0
+    for match in _PARAGRAPH_ENDS_RE.finditer(text):
+        cp = match.start()
+        paragraph = text[paragraph_start:cp]
+        paragraph_start = cp + 1
+        in_table, ttp, row = properties.at(fc_at(cp))
+        if ttp:
+            table_rows.append((row_cells, row))
+            row_cells, cell_parts = [], []
+        elif in_table or match.group() == _CELL_MARK:
+            cell_parts.append(paragraph)
+            if match.group() == _CELL_MARK:
+                row_cells.append(_clean_cell_text('\n'.join(cell_parts)))
+                cell_parts = []
+        elif table_rows:
+            for values in _table_values(table_rows):
+                yield table_index, values
+            table_index += 1
+            table_rows = []
+    for values in _table_values(table_rows):
+        yield table_index, values
@@ -0,0 +1,87 @@
+import zipfile
+import xml.etree.ElementTree as ET
+
+# Потоковое чтение таблиц .docx напрямую из word/document.xml (без дерева объектов python-docx).
+# Текст ячеек собирается так же, как cell.text в python-docx: абзацы через "\n",
+# ячейка с gridSpan повторяется для каждой колонки сетки, продолжение вертикального
+# объединения (vMerge) получает текст верхней ячейки.
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_BODY, _TBL, _TR, _TC, _TCPR, _TRPR = _W + 'body', _W + 'tbl', _W + 'tr', _W + 'tc', _W + 'tcPr', _W + 'trPr'
+_P, _R, _HYPERLINK, _T = _W + 'p', _W + 'r', _W + 'hyperlink', _W + 't'
+_GRID_SPAN, _GRID_BEFORE, _V_MERGE, _VAL, _TYPE = _W + 'gridSpan', _W + 'gridBefore', _W + 'vMerge', _W + 'val', _W + 'type'
+_RUN_SYMBOLS = {_W + 'tab': '\t', _W + 'ptab': '\t', _W + 'cr': '\n', _W + 'noBreakHyphen': '-'}
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        if child.tag == _T:
+            parts.append(child.text or '')
+        elif child.tag == _W + 'br':
+            if child.get(_TYPE, 'textWrapping') == 'textWrapping': parts.append('\n')
+        elif child.tag in _RUN_SYMBOLS:
+            parts.append(_RUN_SYMBOLS[child.tag])
+    return ''.join(parts)
+
+def _paragraph_text(paragraph):
+    parts = []
+    for child in paragraph:
+        if child.tag == _R:
+            parts.append(_run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(_run_text(run) for run in child if run.tag == _R)
+    return ''.join(parts)
+
+def _int_prop(parent, tag, default):
+    if parent is None: return default
+    element = parent.find(tag)
+    if element is None: return default
+    try: return int(element.get(_VAL))
+    except (TypeError, ValueError): return default
+
+def _row_values(tr, row_above):
+    """
+    Возвращает (значения ячеек строки, карта "смещение в сетке -> текст" для следующей строки).
+    """
+    values = []
+    grid = {}
+    offset = _int_prop(tr.find(_TRPR), _GRID_BEFORE, 0)
+    for tc in tr.findall(_TC):
+        tc_pr = tc.find(_TCPR)
+        span = _int_prop(tc_pr, _GRID_SPAN, 1)
+        v_merge = tc_pr.find(_V_MERGE) if tc_pr is not None else None
+        if v_merge is not None and v_merge.get(_VAL, 'continue') == 'continue':
+            text = row_above.get(offset, '')
+        else:
+            text = '\n'.join(_paragraph_text(p) for p in tc.findall(_P))
+        grid[offset] = text
+        values.extend([text] * span)
+        offset += span
+    return values, grid
+
+def iter_docx_rows(file_path):
+    """
+    Потоково перебирает строки таблиц верхнего уровня документа.
+    Выдает кортежи (номер таблицы, список строковых значений ячеек).
+    Разобранные элементы сразу удаляются из дерева, поэтому память не растет с размером документа.
+    """
+    with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as xml_file:
+        stack = []
+        table_index = -1
+        row_above = {}
+        for event, element in ET.iterparse(xml_file, events=('start', 'end')):
+            if event == 'start':
+                stack.append(element)
+                if element.tag == _TBL and len(stack) == 3 and stack[1].tag == _BODY:
+                    table_index += 1
+                    row_above = {}
+                continue
+
+            stack.pop()
+            depth = len(stack)
+            if element.tag == _TR and depth == 3 and stack[1].tag == _BODY and stack[2].tag == _TBL:
+                values, row_above = _row_values(element, row_above)
+                stack[2].remove(element)
+                yield table_index, values
+            elif depth == 2 and stack[1].tag == _BODY:
+                stack[1].remove(element)
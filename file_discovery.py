@@ -0,0 +1,60 @@
+import os
+import queue
+import fnmatch
+import concurrent.futures
+
+# Поиск файлов журналов через os.scandir: тип записи берется из DirEntry (без лишних stat),
+# подпапки обходятся параллельно, найденные файлы выдаются сразу, не дожидаясь конца обхода.
+
+def file_name_matches(name, keyword, include=None, exclude=None):
+    lower_name = name.lower()
+    if name.startswith('~'): return False  # ~$ — файлы блокировки Office
+    if keyword and keyword not in lower_name: return False
+    if include and not any(fnmatch.fnmatch(lower_name, pattern.lower()) for pattern in include): return False
+    if exclude and any(fnmatch.fnmatch(lower_name, pattern.lower()) for pattern in exclude): return False
+    return True
+
+def _scan_directory(dir_path, depth, max_depth, results, keyword, include, exclude, with_stat=False):
+    """Сканирует одну папку, складывая в очередь найденные файлы и подпапки для дальнейшего обхода."""
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        if file_name_matches(entry.name, keyword, include, exclude):
+                            # stat из DirEntry: в Windows он уже получен при обходе, в Linux — один вызов без повторов
+                            results.put(('file', entry.path, entry.stat() if with_stat else None))
+                    elif entry.is_dir() and depth < max_depth:
+                        results.put(('dir', entry.path, depth + 1))
+                except OSError:
+                    continue
+    except OSError as e:
+        results.put(('error', dir_path, e))
+    finally:
+        results.put(('done',))
+
+def iter_files(start_path, keyword, max_depth=2, include=None, exclude=None, workers=8, on_error=None, with_stat=False):
+    """
+    Потоково выдает пути файлов, в имени которых есть keyword, до глубины max_depth
+    (1 — только start_path, 2 — плюс его подпапки и т.д.). include/exclude — списки glob-шаблонов
+    для имени файла (без учета регистра). Ошибки доступа к подпапкам передаются в on_error(path, error),
+    ошибка доступа к самой start_path пробрасывается. Порядок файлов не определен.
+    При with_stat выдаются пары (путь, os.stat_result) — без отдельного os.stat для каждого файла.
+    """
+    results = queue.Queue()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        executor.submit(_scan_directory, start_path, 1, max_depth, results, keyword, include, exclude, with_stat)
+        pending = 1
+        while pending:
+            item = results.get()
+            kind = item[0]
+            if kind == 'file':
+                yield (item[1], item[2]) if with_stat else item[1]
+            elif kind == 'dir':
+                pending += 1
+                executor.submit(_scan_directory, item[1], item[2], max_depth, results, keyword, include, exclude, with_stat)
+            elif kind == 'error':
+                if item[1] == start_path: raise item[2]
+                if on_error: on_error(item[1], item[2])
+            else:
+                pending -= 1
@@ -0,0 +1,209 @@
+"""
+Индекс строк журналов в SQLite: для каждой учтенной строки — файл, таблица/лист, номер строки,
+исходное наименование, ключ материала, длина, количество и сработавшее правило.
+Заполняется при разборе (python parser_engine.py <папка> --index index.sqlite); при повторном
+запуске заменяются строки только измененных файлов.
+
+  python line_index.py index.sqlite materials [--like "50x%"]   # материалы: число файлов и общая длина
+  python line_index.py index.sqlite where 50x5                   # где встречается материал
+  python line_index.py index.sqlite file "%Журнал 3%"            # строки файла(ов)
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from contextlib import contextmanager
+
+INDEX_SCHEMA_VERSION = 1
+INDEX_COMMIT_EVERY = 5000  # Строк между фиксациями транзакции
+INDEX_BUSY_TIMEOUT = 30  # Секунд ожидания, пока индекс занят записью другого процесса
+
+# Во время разбора файла с индексированием сюда собираются строки
+# (таблица, номер строки, наименование, материал, длина в мм, количество, правило); иначе None.
+active = None
+
+@contextmanager
+def collect(enabled=True):
+    """Включает сбор строк для индекса на время разбора одного файла; выдает список (или None)."""
+    global active
+    previous = active
+    active = line_items = [] if enabled else None
+    try:
+        yield line_items
+    finally:
+        active = previous
+
+class LineIndex:
+    """
+    Индекс в SQLite (журнал WAL, чтение не блокируется). Замены файлов и отметки "файл встречен" копятся
+    в памяти и записываются короткими транзакциями (flush), поэтому во время разбора блокировка на запись
+    не держится и индексом могут пользоваться другие процессы.
+    """
+
+    def __init__(self, db_path, fingerprint=None):
+        self.pending_rows = 0
+        self.pending_files = []  # (путь, размер, mtime_ns или None, строки)
+        self.pending_seen = []  # id файлов, встреченных неизмененными
+        self.files_replaced = self.rows_replaced = 0
+        self.run_started = time.time()
+        self.connection = sqlite3.connect(db_path, timeout=INDEX_BUSY_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS files ("
+            " id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, last_seen REAL);"
+            "CREATE TABLE IF NOT EXISTS line_items ("
+            " file_id INTEGER REFERENCES files(id) ON DELETE CASCADE, table_name TEXT, row_number INTEGER,"
+            " raw_name TEXT, material TEXT, length_mm REAL, quantity REAL, rule TEXT);"
+            "CREATE INDEX IF NOT EXISTS line_items_material ON line_items (material);"
+            "CREATE INDEX IF NOT EXISTS line_items_file ON line_items (file_id);"
+        )
+        if fingerprint is not None:
+            # Другая версия/настройки разбора — прежние строки недействительны
+            fingerprint = f"{INDEX_SCHEMA_VERSION}:{fingerprint}"
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            if row is None or row[0] != fingerprint:
+                self.connection.execute("DELETE FROM line_items")
+                self.connection.execute("DELETE FROM files")
+                self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        self.connection.commit()
+
+    def is_current(self, file_path):
+        """Проиндексирован ли файл в его нынешнем виде (тот же размер и mtime)."""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self.connection.execute("SELECT id, size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None or row[1] != stat.st_size or row[2] != stat.st_mtime_ns:
+            return False
+        self.pending_seen.append((time.time(), row[0]))
+        return True
+
+    def replace_file(self, file_path, line_items, complete=True, state=None):
+        """
+        Заменяет строки файла. complete=False (разбор с ошибками) — строки сохраняются,
+        но файл не считается проиндексированным и будет разобран при следующем запуске.
+        state — (размер, mtime_ns, ...) файла до разбора (result_cache.file_state); без него файл проверяется сейчас.
+        """
+        path = os.path.abspath(file_path)
+        if state is None:
+            stat = os.stat(path)
+            state = (stat.st_size, stat.st_mtime_ns)
+        line_items = list(line_items or ())
+        self.pending_files.append((path, state[0], state[1] if complete else None, line_items))
+        self.files_replaced += 1
+        self.rows_replaced += len(line_items)
+        self.pending_rows += 1 + len(line_items)
+        if self.pending_rows >= INDEX_COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной транзакцией (они становятся видны другим процессам)."""
+        pending_files, pending_seen = self.pending_files, self.pending_seen
+        self.pending_files, self.pending_seen, self.pending_rows = [], [], 0
+        with self.connection:
+            for path, size, mtime_ns, line_items in pending_files:
+                self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                file_id = self.connection.execute(
+                    "INSERT INTO files (path, size, mtime_ns, last_seen) VALUES (?, ?, ?, ?)",
+                    (path, size, mtime_ns, time.time())
+                ).lastrowid
+                self.connection.executemany(
+                    "INSERT INTO line_items (file_id, table_name, row_number, raw_name, material, length_mm, quantity, rule)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((file_id,) + tuple(item) for item in line_items)
+                )
+            self.connection.executemany("UPDATE files SET last_seen = ? WHERE id = ?", pending_seen)
+
+    def prune(self, root=None):
+        """
+        Удаляет исчезнувшие файлы (среди не встреченных в этом запуске) вместе с их строками.
+        Проверяются только файлы внутри папки root (без root — ни один), как в ResultCache.prune.
+        """
+        self.flush()
+        if root is None: return
+        prefix = os.path.join(os.path.abspath(root), '')
+        unseen = self.connection.execute(
+            "SELECT id, path FROM files WHERE last_seen < ? AND substr(path, 1, ?) = ?",
+            (self.run_started, len(prefix), prefix)
+        ).fetchall()
+        self.connection.executemany(
+            "DELETE FROM files WHERE id = ?", [(file_id,) for file_id, path in unseen if not os.path.exists(path)]
+        )
+        self.connection.commit()
+
+    def close(self, root=None):
+        try:
+            self.prune(root)
+        finally:
+            self.connection.close()
+
+    # --- Запросы ---
+
+    def materials(self, like=None):
+        """[(материал, число файлов, число строк, общая длина в м), ...], like — шаблон SQL LIKE для материала."""
+        return self.connection.execute(
+            "SELECT material, COUNT(DISTINCT file_id), COUNT(*), SUM(length_mm * quantity) / 1000 FROM line_items"
+            + (" WHERE material LIKE ?" if like else "") + " GROUP BY material ORDER BY material",
+            (like,) if like else ()
+        ).fetchall()
+
+    def where_used(self, material):
+        """Строки с материалом: [(файл, таблица, № строки, наименование, длина мм, количество, правило), ...]."""
+        return self.connection.execute(
+            "SELECT files.path, table_name, row_number, raw_name, length_mm, quantity, rule"
+            " FROM line_items JOIN files ON files.id = line_items.file_id"
+            " WHERE material = ? ORDER BY files.path, table_name, row_number",
+            (material,)
+        ).fetchall()
+
+    def file_items(self, path_like):
+        """Строки файлов, путь которых подходит под шаблон LIKE: [(файл, таблица, № строки, наименование, материал, длина мм, количество, правило), ...]."""
+        return self.connection.execute(
+            "SELECT files.path, table_name, row_number, raw_name, material, length_mm, quantity, rule"
+            " FROM line_items JOIN files ON files.id = line_items.file_id"
+            " WHERE files.path LIKE ? ORDER BY files.path, table_name, row_number",
+            (path_like,)
+        ).fetchall()
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("index", help="файл индекса (SQLite)")
+    queries = arg_parser.add_subparsers(dest='query', required=True)
+    materials = queries.add_parser('materials', help="материалы с числом файлов и общей длиной")
+    materials.add_argument("--like", help="шаблон SQL LIKE для ключа материала, например '50x%%'")
+    where = queries.add_parser('where', help="файлы и строки, где встречается материал")
+    where.add_argument("material")
+    file_query = queries.add_parser('file', help="строки файлов по шаблону пути (SQL LIKE)")
+    file_query.add_argument("path_like")
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.exists(args.index):
+        print(f"Ошибка: индекс не найден: {args.index}", file=sys.stderr)
+        return 1
+    if args.query == 'materials':
+        # До замера времени: импорт parser_engine (и его зависимостей) не относится к запросу к индексу
+        from parser_engine import natural_sort_key
+    index = LineIndex(args.index)
+    started = time.perf_counter()
+    try:
+        if args.query == 'materials':
+            rows = sorted(index.materials(args.like), key=lambda row: natural_sort_key(row[0]))
+            for material, files_count, rows_count, total_m in rows:
+                print(f"{material}: {total_m:.3f} м ({rows_count} строк в {files_count} файлах)")
+        elif args.query == 'where':
+            rows = index.where_used(args.material)
+            for path, table_name, row_number, raw_name, length_mm, quantity, rule in rows:
+                print(f"{path} | {table_name}, строка {row_number} | {raw_name} | {length_mm:g} мм x {quantity:g} | {rule}")
+        else:
+            rows = index.file_items(args.path_like)
+            for path, table_name, row_number, raw_name, material, length_mm, quantity, rule in rows:
+                print(f"{path} | {table_name}, строка {row_number} | {raw_name} -> {material} | {length_mm:g} мм x {quantity:g} | {rule}")
+    finally:
+        index.connection.close()
+    print(f"\nНайдено: {len(rows)} ({(time.perf_counter() - started) * 1000:.1f} мс)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
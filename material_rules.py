@@ -0,0 +1,61 @@
+import re
+import functools
+from collections import namedtuple
+
+# Таблица правил классификации материала по тексту "наименование + материал".
+# Правила проверяются по порядку, срабатывает первое совпавшее (как в исходном каскаде re.search).
+# precheck — дешевая проверка подстрок: если она ложна, регулярное выражение заведомо не совпадет
+# и не запускается. length_from_column — длина берется из столбца длины, а не из "L=" в тексте.
+MaterialRule = namedtuple('MaterialRule', ['name', 'regex', 'precheck', 'make_key', 'length_from_column'])
+
+_DIGIT_RE = re.compile(r'\d')
+
+MATERIAL_RULES = (
+    MaterialRule(
+        name='rebar',
+        regex=re.compile(r'[АаAa][54]00[СсСc]?.*?(?:диаметр|d|D|⌀|ø)\s*(\d+(?:,\d+)?).*?L\s*=\s*(\d+)', re.IGNORECASE),
+        precheck=lambda text, lower_text: '00' in text and '=' in text,
+        make_key=lambda match: f"Арматура d {match.group(1).replace(',', '.')}",
+        length_from_column=False,
+    ),
+    MaterialRule(
+        name='profile_with_l',
+        regex=re.compile(r'(\d+(?:,\d+)?(?:\s*[хx]\s*\d+(?:,\d+)?){1,2}).*?L\s*=\s*(\d+)', re.IGNORECASE),
+        precheck=lambda text, lower_text: '=' in text and ('x' in lower_text or 'х' in lower_text),
+        make_key=lambda match: match.group(1).replace(',', '.').replace(' ', ''),
+        length_from_column=False,
+    ),
+    MaterialRule(
+        name='standard_profile',
+        regex=re.compile(r'(\d+(?:,\d+)?(?:\s*[хx]\s*\d+(?:,\d+)?){1,2})'),
+        precheck=lambda text, lower_text: 'x' in text or 'х' in text,
+        make_key=lambda match: match.group(1).replace(',', '.').replace(' ', ''),
+        length_from_column=True,
+    ),
+)
+
+def classify_material(search_text, has_length_column, rules=MATERIAL_RULES):
+    """
+    Определяет материал по тексту строки.
+    Возвращает кортеж (имя правила, ключ материала, длина в мм) или None, если ни одно правило не подошло.
+    Для правил с length_from_column длина равна None — ее нужно взять из столбца длины.
+    Правила, которым нужен столбец длины, пропускаются при has_length_column=False.
+    """
+    if not _DIGIT_RE.search(search_text): return None
+    lower_text = search_text.lower()
+    for rule in rules:
+        if rule.length_from_column and not has_length_column: continue
+        if not rule.precheck(search_text, lower_text): continue
+        match = rule.regex.search(search_text)
+        if match:
+            length_mm = None if rule.length_from_column else float(match.group(2))
+            return rule.name, rule.make_key(match), length_mm
+    return None
+
+def memoized_classifier(maxsize):
+    """
+    classify_material с LRU-кэшем результатов (в том числе "не подошло") на maxsize разных текстов строк:
+    повторяющиеся наименования стоят одного поиска в словаре. Кэш functools.lru_cache потокобезопасен;
+    в пуле процессов у каждого процесса свой. Статистика — cache_info(); maxsize=0 — без кэширования.
+    """
+    return functools.lru_cache(maxsize=maxsize)(classify_material)
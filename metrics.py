@@ -0,0 +1,125 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import cProfile
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Инструментирование разбора: таймеры этапов и счетчики строк/правил для каждого файла.
+# Во время разбора файла его метрики доступны как metrics.active (в каждом процессе-обработчике свои),
+# горячий путь только увеличивает счетчики: active.counters['rows_scanned'] += 1.
+# Вне collect() счет идет в "пустой" приемник, поэтому функции разбора не проверяют, включены ли метрики.
+
+ROW_COUNTERS = ['rows_scanned', 'rows_empty', 'rows_no_name', 'rows_excluded', 'rows_no_quantity',
+                'rows_no_match', 'rows_zero_length', 'rows_matched']
+
+class FileMetrics:
+    def __init__(self, file_path=None):
+        self.file_path = file_path
+        self.counters = Counter()
+        self.timings = defaultdict(float)
+        self.total_seconds = 0.0
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += time.perf_counter() - start
+
+    def add_timing(self, stage, seconds):
+        self.timings[stage] += seconds
+
+    def to_dict(self):
+        return {'total_seconds': self.total_seconds, 'counters': dict(self.counters), 'timings': dict(self.timings)}
+
+active = FileMetrics()
+
+@contextmanager
+def collect(file_path, profile_dir=None):
+    """
+    Собирает метрики разбора одного файла в новый FileMetrics (он же metrics.active внутри блока).
+    При заданном profile_dir разбор дополнительно профилируется cProfile в <profile_dir>/<имя файла>.<хэш пути>.prof
+    (хэш различает одноименные файлы из разных папок).
+    """
+    global active
+    previous = active
+    active = file_metrics = FileMetrics(file_path)
+    profiler = cProfile.Profile() if profile_dir else None
+    start = time.perf_counter()
+    if profiler: profiler.enable()
+    try:
+        yield file_metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:8]
+            profiler.dump_stats(os.path.join(profile_dir, f"{os.path.basename(file_path)}.{path_hash}.prof"))
+        file_metrics.total_seconds = time.perf_counter() - start
+        active = previous
+
+class RunMetrics:
+    """Метрики всего запуска: по файлам (словари FileMetrics.to_dict) и суммарные."""
+
+    def __init__(self):
+        self.files = {}
+
+    def add(self, relative_path, file_metrics):
+        if file_metrics:
+            self.files[relative_path] = file_metrics
+
+    def totals(self):
+        counters = Counter()
+        timings = defaultdict(float)
+        for file_metrics in self.files.values():
+            counters.update(file_metrics['counters'])
+            for stage, seconds in file_metrics['timings'].items():
+                timings[stage] += seconds
+        return {
+            'files': len(self.files),
+            'total_seconds': sum(m['total_seconds'] for m in self.files.values()),
+            'counters': dict(counters), 'timings': dict(timings),
+        }
+
+    def slowest(self, count=10):
+        return sorted(self.files.items(), key=lambda item: item[1]['total_seconds'], reverse=True)[:count]
+
+    def log_summary(self, log, count=10):
+        if not self.files: return
+        totals = self.totals()
+        counters = totals['counters']
+        log(f"\nСтрок просмотрено: {counters.get('rows_scanned', 0)}, учтено: {counters.get('rows_matched', 0)}, "
+            f"пропущено: пустых {counters.get('rows_empty', 0)}, исключенных {counters.get('rows_excluded', 0)}, "
+            f"с количеством <= 0 {counters.get('rows_no_quantity', 0)}, без совпадений {counters.get('rows_no_match', 0)}")
+        rule_hits = ', '.join(f"{key[5:]} {value}" for key, value in sorted(counters.items()) if key.startswith('rule:'))
+        if rule_hits:
+            log(f"Срабатывания правил: {rule_hits}")
+        memo_lookups = counters.get('memo_hits', 0) + counters.get('memo_misses', 0)
+        if memo_lookups:
+            log(f"Кэш классификации: {counters.get('memo_hits', 0)} попаданий из {memo_lookups} "
+                f"({counters.get('memo_hits', 0) / memo_lookups:.0%})")
+        log(f"\n--- {count} самых медленных файлов ---")
+        for relative_path, file_metrics in self.slowest(count):
+            stages = ', '.join(f"{stage} {seconds:.3f} с" for stage, seconds in sorted(file_metrics['timings'].items()))
+            log(f"{file_metrics['total_seconds']:.3f} с  {relative_path}" + (f"  ({stages})" if stages else ""))
+
+    def write(self, path):
+        """Сохраняет метрики в JSON или, если имя оканчивается на .csv, в CSV (строка на файл)."""
+        if path.lower().endswith('.csv'):
+            stages = sorted({stage for m in self.files.values() for stage in m['timings']})
+            counters = ROW_COUNTERS + sorted({key for m in self.files.values() for key in m['counters']} - set(ROW_COUNTERS))
+            with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(['file', 'total_seconds'] + [f"time:{stage}" for stage in stages] + counters)
+                for relative_path, m in sorted(self.files.items()):
+                    writer.writerow([relative_path, f"{m['total_seconds']:.6f}"]
+                                    + [f"{m['timings'].get(stage, 0):.6f}" for stage in stages]
+                                    + [m['counters'].get(key, 0) for key in counters])
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'totals': self.totals(), 'slowest': [relative_path for relative_path, _ in self.slowest()], 'files': self.files},
+                          f, ensure_ascii=False, indent=2)
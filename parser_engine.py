@@ -0,0 +1,862 @@
+import os
+import re
+import sys
+import argparse
+import fnmatch
+import hashlib
+import sqlite3
+import multiprocessing
+import queue
+import shutil
+import signal
+import pathlib
+import tempfile
+import functools
+import time
+import subprocess
+import importlib.util
+from collections import defaultdict, namedtuple
+from itertools import groupby
+from operator import itemgetter
+from material_rules import MATERIAL_RULES, memoized_classifier
+from docx_stream import iter_docx_rows
+from doc_binary import iter_doc_rows
+from result_cache import ResultCache, file_state
+from file_discovery import iter_files
+from worker_pool import WorkerPool
+from aggregation_store import AggregationStore
+from report_export import export_report
+import metrics
+import line_index
+
+# --- КОНФИГУРАЦИЯ ---
+PARSER_VERSION = '10.5'  # Менять при любом изменении логики разбора: от него зависит кэш результатов
+NAME_KEYWORDS = ['наименование', 'позиция']
+MATERIAL_KEYWORDS = ['материал']
+LENGTH_KEYWORDS = ['длин', 'метр']
+QUANTITY_KEYWORDS = ['кол', 'шт', 'колич']
+CONTINGENCY_PERCENTAGE = 10
+FILENAME_FILTER_KEYWORD = 'журнал'
+EXCLUDE_KEYWORD = 'лист'
+CLASSIFICATION_MEMO_SIZE = 100000  # Сколько разных текстов строк помнить с результатом классификации (0 — не кэшировать)
+XLSX_HEADER_SEARCH_ROWS = 100  # Сколько первых строк листа просматривать в поисках заголовка (None — весь лист)
+DOCX_BACKEND = 'stream'  # 'stream' — потоковый разбор XML, 'python-docx' — через Document
+DOCX_BACKEND_BY_GLOB = {}  # Способ чтения .docx для отдельных файлов: {glob-шаблон имени: способ}, например {'*спецификац*': 'python-docx'}
+DOC_BACKEND = 'binary'  # 'binary' — чтение формата Word 97–2003 без Word, 'word' — MS Word через COM, 'libreoffice' — конвертация в .docx
+# (сверка 'binary' с эталоном: python -m benchmarks.check_doc_binary)
+WORKER_MAX_TASKS = 200  # После стольких файлов процесс-обработчик перезапускается
+WORKER_MAX_MEMORY_MB = 1024  # ...или если его память превысила этот предел (МБ; только процесс Python — память WINWORD.EXE и LibreOffice не учитывается)
+FILE_TIMEOUT = 300  # Секунд на один файл, после чего процесс-обработчик убивается вместе со своим MS Word (None — без ограничения)
+CONVERT_TIMEOUT = 240  # Секунд на конвертацию одного .doc в LibreOffice (не больше 80% FILE_TIMEOUT: конвертер завершает сам обработчик)
+SEARCH_MAX_DEPTH = 2  # 1 — только выбранная папка, 2 — плюс ее подпапки и т.д.
+INCLUDE_GLOBS = []  # Если не пусто — имя файла должно подходить под один из шаблонов (например, '*.xlsx')
+EXCLUDE_GLOBS = []  # Файлы, подходящие под эти шаблоны, пропускаются
+DISCOVERY_WORKERS = 8  # Потоков для параллельного обхода подпапок (полезно на сетевых дисках)
+CACHE_FILE = os.path.join(os.path.expanduser('~'), '.journal_parser_cache.sqlite')
+WATCH_INTERVAL = 1.0  # Секунд между опросами папки в режиме наблюдения (--watch)
+EXPORT_FILE_NAME = 'Спецификация материалов.xlsx'  # Имя отчета, которое GUI предлагает при сохранении; .csv — в CSV
+# ------------------------------------
+
+classify = memoized_classifier(CLASSIFICATION_MEMO_SIZE)
+
+def find_columns_indices(header_row):
+    indices = {'name': None, 'material': None, 'length': None, 'quantity': None}
+    for i, cell_text in enumerate(header_row):
+        if not cell_text: continue
+        lower_cell_text = str(cell_text).lower()
+        if any(kw in lower_cell_text for kw in NAME_KEYWORDS): indices['name'] = i
+        if any(kw in lower_cell_text for kw in MATERIAL_KEYWORDS): indices['material'] = i
+        if any(kw in lower_cell_text for kw in LENGTH_KEYWORDS): indices['length'] = i
+        if any(kw in lower_cell_text for kw in QUANTITY_KEYWORDS): indices['quantity'] = i
+    return indices
+
+def parse_value(value):
+    if isinstance(value, (int, float)): return value
+    if isinstance(value, str):
+        try: return float(value.replace(',', '.').strip())
+        except (ValueError, TypeError): return 0
+    return 0
+
+def natural_sort_key(s):
+    return [int(text) if text.isdigit() else text.lower() for text in re.split('([0-9]+)', str(s))]
+
+def process_row(row_data, column_indices, file_data, line_items=None, row_ref=None):
+    counters = metrics.active.counters
+    name_idx, material_idx, length_col_idx, quantity_hdr_idx = (
+        column_indices.get('name'), column_indices.get('material'),
+        column_indices.get('length'), column_indices.get('quantity')
+    )
+    if name_idx is None or quantity_hdr_idx is None: return
+
+    name_content = str(row_data[name_idx]).strip() if len(row_data) > name_idx else ""
+    if not name_content:
+        counters['rows_no_name'] += 1
+        return
+
+    search_text = name_content
+    if material_idx is not None and len(row_data) > material_idx:
+        search_text += " " + str(row_data[material_idx]).strip()
+
+    if EXCLUDE_KEYWORD in search_text.lower():
+        counters['rows_excluded'] += 1
+        return
+
+    quantity = 0
+    is_short_row = "L=" in name_content.upper() and len(row_data) < quantity_hdr_idx
+
+    if is_short_row:
+        if len(row_data) > 1: quantity = parse_value(row_data[-1])
+    elif len(row_data) > quantity_hdr_idx:
+        quantity = parse_value(row_data[quantity_hdr_idx])
+
+    if quantity <= 0:
+        counters['rows_no_quantity'] += 1
+        return
+
+    has_length_column = length_col_idx is not None and len(row_data) > length_col_idx
+    classified = classify(search_text, has_length_column)
+    if classified is None:
+        counters['rows_no_match'] += 1
+        return
+    rule_name, material, length_mm = classified
+    counters['rule:' + rule_name] += 1
+    if length_mm is None:
+        length_mm = parse_value(row_data[length_col_idx])
+    if length_mm > 0:
+        file_data[material] += (length_mm / 1000) * quantity
+        counters['rows_matched'] += 1
+        if line_items is not None:
+            line_items.append(row_ref + (name_content, material, length_mm, quantity, rule_name))
+    else:
+        counters['rows_zero_length'] += 1
+
+def process_table_iterator(rows_iterator, column_indices, file_data, table_name='', first_row_number=2):
+    """table_name и first_row_number (номер первой строки данных) — для ссылок на строки в индексе."""
+    last_material_name = ""
+    name_idx = column_indices['name']
+    counters = metrics.active.counters
+    line_items = line_index.active
+    memo_before = classify.cache_info()
+    for row_number, row_data in enumerate(rows_iterator, first_row_number):
+        counters['rows_scanned'] += 1
+        if not any(v for v in row_data if v and str(v).strip()):
+            counters['rows_empty'] += 1
+            continue
+        processed_row_data = list(row_data)
+        if len(processed_row_data) <= name_idx:
+            counters['rows_no_name'] += 1
+            continue
+        name_cell_value = str(processed_row_data[name_idx]).strip()
+        if name_cell_value:
+            last_material_name = name_cell_value
+        else:
+            processed_row_data[name_idx] = last_material_name
+        process_row(processed_row_data, column_indices, file_data,
+                    line_items, (table_name, row_number) if line_items is not None else None)
+    memo_after = classify.cache_info()
+    counters['memo_hits'] += memo_after.hits - memo_before.hits
+    counters['memo_misses'] += memo_after.misses - memo_before.misses
+
+def parse_xlsx(file_path, file_data, log=print):
+    file_metrics = metrics.active
+    try:
+        import openpyxl
+        # read_only: строки читаются потоком из XML листа, память не зависит от размера листа
+        with file_metrics.timer('load'):
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+        try:
+            for sheet in workbook.worksheets:
+                sheet_started = time.perf_counter()
+                rows_seconds = 0.0
+                # Размеры листа (<dimension>) не используются: некоторые программы пишут их неверно
+                # (например, "A1"), и read_only молча обрезал бы строки и столбцы за их пределами.
+                # Без них строки выдаются до последней заполненной ячейки и дополняются ниже до ширины заголовка.
+                sheet.reset_dimensions()
+                rows = sheet.iter_rows(values_only=True)
+                for row_idx, header_row_values in enumerate(rows):
+                    if XLSX_HEADER_SEARCH_ROWS is not None and row_idx >= XLSX_HEADER_SEARCH_ROWS: break
+                    column_indices = find_columns_indices(header_row_values)
+                    if column_indices.get('name') is not None and column_indices.get('quantity') is not None:
+                        # Оставшиеся строки того же итератора — данные таблицы
+                        rows_started = time.perf_counter()
+                        width = len(header_row_values)
+                        padded_rows = (tuple(row) + (None,) * (width - len(row)) if len(row) < width else row for row in rows)
+                        process_table_iterator(padded_rows, column_indices, file_data, sheet.title, row_idx + 2)
+                        rows_seconds = time.perf_counter() - rows_started
+                        break
+                file_metrics.add_timing('rows', rows_seconds)
+                file_metrics.add_timing('header_search', time.perf_counter() - sheet_started - rows_seconds)
+        finally:
+            workbook.close()
+    except Exception as e:
+        log(f"  > Ошибка при чтении файла XLSX: {os.path.basename(file_path)} ({e})")
+
+def parse_docx(file_path, file_data, log=print):
+    file_metrics = metrics.active
+    try:
+        from docx import Document
+        with file_metrics.timer('load'):
+            document = Document(file_path)
+        for table_number, table in enumerate(document.tables, 1):
+            header_row_values = [cell.text for cell in table.rows[0].cells]
+            column_indices = find_columns_indices(header_row_values)
+            if column_indices.get('name') is not None and column_indices.get('quantity') is not None:
+                rows_iterator = (
+                    [cell.text for cell in row.cells]
+                    for row in table.rows[1:]
+                )
+                with file_metrics.timer('rows'):
+                    process_table_iterator(rows_iterator, column_indices, file_data, f"Таблица {table_number}")
+    except Exception as e:
+        log(f"  > Ошибка при чтении файла DOCX: {os.path.basename(file_path)} ({e})")
+
+def process_table_rows(table_rows, file_data):
+    """Обрабатывает поток (номер таблицы, значения ячеек): первая строка каждой таблицы — заголовок."""
+    for table_index, rows in groupby(table_rows, key=itemgetter(0)):
+        header = next(rows)
+        column_indices = find_columns_indices(header[1])
+        if column_indices.get('name') is not None and column_indices.get('quantity') is not None:
+            rows_iterator = (row_values for _, row_values in rows)
+            process_table_iterator(rows_iterator, column_indices, file_data, f"Таблица {table_index + 1}")
+
+def parse_docx_stream(file_path, file_data, log=print):
+    try:
+        with metrics.active.timer('rows'):  # чтение XML и обработка строк идут вперемешку
+            process_table_rows(iter_docx_rows(file_path), file_data)
+    except Exception as e:
+        log(f"  > Ошибка при чтении файла DOCX: {os.path.basename(file_path)} ({e})")
+
+def parse_doc_binary(file_path, file_data, log=print):
+    try:
+        with metrics.active.timer('rows'):
+            process_table_rows(iter_doc_rows(file_path), file_data)
+    except Exception as e:
+        log(f"  > Ошибка при обработке DOC: {os.path.basename(file_path)} ({e})")
+
+# --- Реестр форматов: расширение -> способы разбора ---
+# Библиотеки формата импортируются внутри функции разбора при первом файле этого формата, поэтому
+# запуск не платит за openpyxl/python-docx/olefile, если таких файлов нет. modules — что должно быть
+# установлено; проверяется до разбора без импорта (missing_requirements).
+FormatParser = namedtuple('FormatParser', 'description modules parse')
+
+FORMAT_PARSERS = {
+    '.xlsx': {'openpyxl': FormatParser('Excel 2007+', ['openpyxl'], parse_xlsx)},
+    '.docx': {
+        'stream': FormatParser('Word 2007+, потоковый разбор XML', [], parse_docx_stream),
+        'python-docx': FormatParser('Word 2007+, python-docx', ['docx'], parse_docx),
+    },
+    '.doc': {'binary': FormatParser('Word 97–2003, чтение без Word', ['olefile'], parse_doc_binary)},
+}
+DOCX_PARSERS = FORMAT_PARSERS['.docx']
+
+def format_parser_for(file_ext, docx_backend=DOCX_BACKEND, doc_backend=DOC_BACKEND):
+    """FormatParser для расширения file_ext при выбранных способах чтения .docx/.doc (None — формат не поддерживается)."""
+    backends = FORMAT_PARSERS.get(file_ext)
+    if not backends: return None
+    if file_ext == '.docx': return backends.get(docx_backend)
+    if file_ext == '.doc': return backends.get(doc_backend)
+    return next(iter(backends.values()))
+
+def docx_backend_for(file_path, docx_backend=DOCX_BACKEND):
+    """Способ чтения .docx для файла: по первому подходящему шаблону DOCX_BACKEND_BY_GLOB, иначе docx_backend."""
+    lower_name = os.path.basename(file_path).lower()
+    for pattern, backend in DOCX_BACKEND_BY_GLOB.items():
+        if fnmatch.fnmatch(lower_name, pattern.lower()): return backend
+    return docx_backend
+
+def state_before_parse(file_path, with_state):
+    """
+    Состояние файла (result_cache.file_state) до его чтения: with_state='hash' — с хэшем содержимого (для кэша),
+    'stat' — только размер и mtime (для индекса строк), None — не нужно.
+    """
+    if not with_state: return None
+    try: return file_state(file_path, with_hash=with_state == 'hash')
+    except OSError: return None
+
+def state_after_parse(file_path, state):
+    """state, если файл не менялся за время разбора; иначе None — результат нельзя сохранять как актуальный."""
+    if state is None: return None
+    try: stat = os.stat(file_path)
+    except OSError: return None
+    return state if (stat.st_size, stat.st_mtime_ns) == state[:2] else None
+
+def parse_file_in_process(file_path, docx_backend=DOCX_BACKEND, profile_dir=None, index_lines=False, with_state=None):
+    """
+    Обрабатывает один .xlsx/.docx/.doc файл (.doc — без MS Word) в дочернем процессе.
+    Возвращает кортеж из пути к файлу, словаря с данными, списка сообщений для лога, метрик
+    разбора (metrics.FileMetrics.to_dict), учтенных строк для индекса (при index_lines, иначе None)
+    и состояния файла до разбора (см. state_before_parse; None, если файл изменился во время разбора);
+    все элементы сериализуемы, чтобы их можно было передать в главный процесс.
+    При заданном profile_dir разбор профилируется cProfile.
+    """
+    file_data = defaultdict(float)
+    messages = []
+    file_ext = os.path.splitext(file_path)[1].lower()
+    format_parser = format_parser_for(file_ext, docx_backend_for(file_path, docx_backend), 'binary')
+    state = state_before_parse(file_path, with_state)
+    with metrics.collect(file_path, profile_dir) as file_metrics, line_index.collect(index_lines) as line_items:
+        if format_parser is not None:
+            format_parser.parse(file_path, file_data, messages.append)
+    return file_path, dict(file_data), messages, file_metrics.to_dict(), line_items, state_after_parse(file_path, state)
+
+def start_word_app():
+    import win32com.client as win32
+    try:
+        # Отдельный экземпляр, а не уже открытый пользователем Word: по таймауту пул может его завершить
+        word_app = win32.DispatchEx("Word.Application")
+        word_app.Visible = False
+        word_app.DisplayAlerts = 0
+        word_app.AutomationSecurity = 3
+    except Exception as e:
+        raise Exception(f"Не удалось запустить MS Word: {e}")
+    return word_app
+
+def word_process_id(word_app):
+    """PID процесса WINWORD.EXE — по окну приложения с уникальным заголовком (None, если найти не удалось)."""
+    try:
+        import win32gui
+        import win32process
+        caption = f"journal_parser_{os.getpid()}_{id(word_app)}"
+        word_app.Caption = caption
+        hwnd = win32gui.FindWindow('OpusApp', caption)
+        return win32process.GetWindowThreadProcessId(hwnd)[1] if hwnd else None
+    except Exception:
+        return None
+
+def kill_process_tree(pid):
+    """Завершает процесс вместе с дочерними (процесс должен быть запущен в своей группе, см. run_with_timeout)."""
+    if os.name == 'nt':
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        try: os.killpg(pid, signal.SIGKILL)
+        except OSError: pass
+
+def run_with_timeout(args, timeout):
+    """
+    Как subprocess.run(check=True), но по истечении timeout секунд завершает программу вместе с ее дочерними
+    процессами (soffice запускает soffice.bin) и вызывает subprocess.TimeoutExpired.
+    """
+    group = {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == 'nt' else {'start_new_session': True}
+    with subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **group) as process:
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process.pid)
+            process.wait()
+            raise
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, args)
+
+def parse_doc_with_word(word_app, file_path, file_data, log=print):
+    doc = None
+    file_metrics = metrics.active
+    try:
+        with file_metrics.timer('word_open'):
+            doc = word_app.Documents.Open(
+                os.path.abspath(file_path),
+                ConfirmConversions=False, ReadOnly=True, AddToRecentFiles=False
+            )
+        for table_number, table in enumerate(doc.Tables, 1):
+            try:
+                header_row = table.Rows(1)
+                header_values = [cell.Range.Text.strip('\r\x07 ').strip() for cell in header_row.Cells]
+                column_indices = find_columns_indices(header_values)
+
+                if column_indices.get('name') is not None and column_indices.get('quantity') is not None:
+                    def com_rows_iterator():
+                        for i in range(2, table.Rows.Count + 1):
+                            yield [cell.Range.Text.strip('\r\x07 ').strip() for cell in table.Rows(i).Cells]
+                    with file_metrics.timer('rows'):
+                        process_table_iterator(com_rows_iterator(), column_indices, file_data, f"Таблица {table_number}")
+            except Exception as e_table:
+                log(f"    > Пропущена таблица в {os.path.basename(file_path)} из-за ошибки: {e_table}")
+                continue
+    except Exception as e_doc:
+        log(f"  > Ошибка при обработке DOC: {os.path.basename(file_path)} ({e_doc})")
+    finally:
+        if doc:
+            doc.Saved = True
+            doc.Close(SaveChanges=False)
+
+# --- Бэкенды для пула обработчиков (worker_pool.WorkerPool) ---
+# open() вызывается один раз на процесс, parse() — для каждого файла и возвращает (данные, сообщения, метрики,
+# строки для индекса, состояние файла до разбора),
+# close() — при перезапуске процесса. profile_dir включает профилирование cProfile каждого файла.
+# external_resources() сообщает пулу запущенные бэкендом программы и временные папки: если процесс убит по таймауту
+# или упал, close() не вызывается, и их завершает/удаляет пул.
+
+class PythonBackend:
+    """Разбор средствами Python (.xlsx, .docx и .doc без Word): отдельная сессия не нужна."""
+
+    def __init__(self, docx_backend=DOCX_BACKEND, profile_dir=None, index_lines=False, with_state=None):
+        self.docx_backend = docx_backend
+        self.profile_dir = profile_dir
+        self.index_lines = index_lines
+        self.with_state = with_state
+
+    def open(self):
+        pass
+
+    def parse(self, file_path):
+        return parse_file_in_process(file_path, self.docx_backend, self.profile_dir, self.index_lines, self.with_state)[1:]
+
+    def close(self):
+        pass
+
+class WordComBackend:
+    """Один экземпляр MS Word на процесс, переиспользуемый для всех его .doc файлов."""
+
+    def __init__(self, profile_dir=None, index_lines=False, with_state=None):
+        self.profile_dir = profile_dir
+        self.index_lines = index_lines
+        self.with_state = with_state
+        self.startup_seconds = None
+
+    @staticmethod
+    def missing_requirements():
+        if importlib.util.find_spec('win32com') is None or importlib.util.find_spec('pythoncom') is None:
+            return "нет библиотеки pywin32 (pip install pywin32)"
+        return None
+
+    def open(self):
+        try:
+            import pythoncom
+        except ImportError:
+            raise Exception("Для обработки .doc через MS Word необходима библиотека pywin32")
+        self.pythoncom = pythoncom
+        started = time.perf_counter()
+        pythoncom.CoInitialize()
+        self.word_app = start_word_app()
+        self.word_pid = word_process_id(self.word_app)
+        self.startup_seconds = time.perf_counter() - started
+
+    def external_resources(self):
+        return [self.word_pid] if self.word_pid else [], []
+
+    def parse(self, file_path):
+        file_data = defaultdict(float)
+        messages = []
+        state = state_before_parse(file_path, self.with_state)
+        with metrics.collect(file_path, self.profile_dir) as file_metrics, line_index.collect(self.index_lines) as line_items:
+            parse_doc_with_word(self.word_app, file_path, file_data, messages.append)
+        if self.startup_seconds is not None:
+            # Запуск Word относим к первому файлу процесса, чтобы он был виден в отчете
+            file_metrics.add_timing('word_startup', self.startup_seconds)
+            self.startup_seconds = None
+        return file_data, messages, file_metrics.to_dict(), line_items, state_after_parse(file_path, state)
+
+    def close(self):
+        try:
+            self.word_app.Quit(SaveChanges=False)
+        finally:
+            self.pythoncom.CoUninitialize()
+
+class LibreOfficeBackend:
+    """
+    Конвертирует .doc в .docx через LibreOffice (soffice --headless) и читает результат потоковым разбором.
+    Профиль LibreOffice создается один раз на процесс, поэтому повторные запуски конвертера быстрее.
+    """
+
+    def __init__(self, profile_dir=None, index_lines=False, with_state=None):
+        self.profile_dir = profile_dir
+        self.index_lines = index_lines
+        self.with_state = with_state
+
+    @staticmethod
+    def missing_requirements():
+        if shutil.which('soffice') or shutil.which('libreoffice'): return None
+        return "не найден LibreOffice (soffice)"
+
+    def open(self):
+        self.soffice = shutil.which('soffice') or shutil.which('libreoffice')
+        if self.soffice is None:
+            raise Exception("не найден LibreOffice (soffice)")
+        self.work_dir = tempfile.mkdtemp(prefix='journal_parser_')
+        self.profile_url = pathlib.Path(self.work_dir, 'profile').as_uri()
+
+    def external_resources(self):
+        return [], [self.work_dir]
+
+    def parse(self, file_path):
+        file_data = defaultdict(float)
+        messages = []
+        out_dir = os.path.join(self.work_dir, 'out')
+        converted_path = os.path.join(out_dir, os.path.splitext(os.path.basename(file_path))[0] + '.docx')
+        state = state_before_parse(file_path, self.with_state)
+        with metrics.collect(file_path, self.profile_dir) as file_metrics, line_index.collect(self.index_lines) as line_items:
+            with file_metrics.timer('convert'):
+                run_with_timeout(
+                    [self.soffice, f'-env:UserInstallation={self.profile_url}', '--headless', '--norestore',
+                     '--convert-to', 'docx', '--outdir', out_dir, os.path.abspath(file_path)],
+                    CONVERT_TIMEOUT if FILE_TIMEOUT is None else min(CONVERT_TIMEOUT, FILE_TIMEOUT * 0.8)
+                )
+            try:
+                parse_docx_stream(converted_path, file_data, messages.append)
+            finally:
+                if os.path.exists(converted_path): os.remove(converted_path)
+        return file_data, messages, file_metrics.to_dict(), line_items, state_after_parse(file_path, state)
+
+    def close(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+DOC_BACKENDS = {'word': WordComBackend, 'libreoffice': LibreOfficeBackend}
+
+def missing_requirements(file_ext, docx_backend=DOCX_BACKEND, doc_backend=DOC_BACKEND):
+    """Почему файлы file_ext нельзя разобрать выбранным способом (None — можно). Сами библиотеки не импортируются."""
+    if file_ext == '.doc' and doc_backend in DOC_BACKENDS:
+        return DOC_BACKENDS[doc_backend].missing_requirements()
+    format_parser = format_parser_for(file_ext, docx_backend, doc_backend)
+    if format_parser is None and file_ext == '.docx':
+        return f"неизвестный способ чтения .docx '{docx_backend}' (есть: {', '.join(sorted(DOCX_PARSERS))})"
+    if format_parser is None:
+        return f"формат {file_ext} не поддерживается"
+    missing = [module for module in format_parser.modules if importlib.util.find_spec(module) is None]
+    if missing:
+        return f"нет библиотеки {', '.join(missing)} (pip install {' '.join(missing)})"
+    return None
+
+def find_journal_files(start_path, max_depth=SEARCH_MAX_DEPTH, include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS, on_error=None,
+                       with_stat=False):
+    """Потоково выдает файлы журналов (с FILENAME_FILTER_KEYWORD в имени) по мере обхода папок (при with_stat — с stat)."""
+    return iter_files(start_path, FILENAME_FILTER_KEYWORD, max_depth, include, exclude, DISCOVERY_WORKERS, on_error, with_stat)
+
+def find_files(start_path, max_depth=SEARCH_MAX_DEPTH, include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS):
+    return sorted(find_journal_files(start_path, max_depth, include, exclude), key=natural_sort_key)
+
+def config_fingerprint(docx_backend=DOCX_BACKEND, doc_backend=DOC_BACKEND):
+    """Отпечаток всего, что влияет на результат разбора файла (для ключа кэша)."""
+    config = (
+        PARSER_VERSION, NAME_KEYWORDS, MATERIAL_KEYWORDS, LENGTH_KEYWORDS, QUANTITY_KEYWORDS,
+        EXCLUDE_KEYWORD, XLSX_HEADER_SEARCH_ROWS, docx_backend, list(DOCX_BACKEND_BY_GLOB.items()), doc_backend,
+        [(rule.name, rule.regex.pattern, rule.regex.flags, rule.length_from_column) for rule in MATERIAL_RULES],
+    )
+    return hashlib.sha1(repr(config).encode('utf-8')).hexdigest()
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def run_analysis(start_path, log=print, max_workers=None, docx_backend=DOCX_BACKEND, doc_backend=DOC_BACKEND,
+                 cache_path=None, max_depth=SEARCH_MAX_DEPTH, include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS,
+                 progress=None, cancel_event=None, metrics_path=None, profile_dir=None, file_filter=None, index_path=None):
+    """
+    Ищет журналы в start_path (до глубины max_depth, с фильтрами include/exclude) и обрабатывает их.
+    Разбор начинается сразу по мере нахождения файлов, не дожидаясь конца обхода папок.
+    Файлы обрабатываются в пуле из max_workers процессов (при max_workers <= 1 — последовательно
+    в текущем процессе). При doc_backend='word'/'libreoffice' .doc файлы обрабатываются в отдельном
+    пуле с прогретыми экземплярами MS Word (COM) / LibreOffice. docx_backend выбирает способ чтения .docx (ключ DOCX_PARSERS).
+    Если задан cache_path, неизмененные файлы берутся из кэша результатов (SQLite), а не разбираются заново.
+    progress(обработано, найдено, поиск_завершен) вызывается после каждого файла; установленный
+    cancel_event (threading.Event) прекращает поиск и отменяет еще не начатый разбор.
+    В конце в лог выводятся счетчики строк и правил и самые медленные файлы; metrics_path — куда
+    сохранить метрики по файлам (JSON или .csv), profile_dir — папка для профилей cProfile каждого файла.
+    file_filter(относительный путь) -> bool отбирает часть найденных файлов (например, один шард, см. sharding).
+    index_path — файл индекса строк (SQLite, см. line_index): учтенные строки разобранных файлов заменяются
+    в нем, а файлы, которых в индексе нет в нынешнем виде, разбираются заново, даже если есть в кэше.
+    Возвращает AggregationStore с итогами по файлам (ключ — путь относительно start_path).
+    """
+    if max_workers is None:
+        max_workers = default_workers()
+
+    store = AggregationStore(natural_sort_key)
+    run_metrics = metrics.RunMetrics()
+    files_found = files_done = 0
+    search_finished = False
+
+    def merge(relative_path, file_specific_data):
+        nonlocal files_done
+        store.add_file(relative_path, file_specific_data)
+        files_done += 1
+        if progress: progress(files_done, files_found, search_finished)
+
+    def discovered_files():
+        nonlocal files_found, search_finished
+        on_error = lambda path, error: log(f"  > Нет доступа к папке {path}: {error}")
+        for path in find_journal_files(start_path, max_depth, include, exclude, on_error):
+            if cancel_event is not None and cancel_event.is_set(): return
+            if file_filter is not None and not file_filter(os.path.relpath(path, start_path)): continue
+            files_found += 1
+            if cache is not None:
+                try:
+                    if index is None or index.is_current(path):
+                        cached_data = cache.get(path)
+                    else:
+                        # Строк файла нет в индексе: итоги из кэша не подойдут, файл нужно разобрать
+                        cached_data = None
+                        cache.misses += 1
+                except (OSError, sqlite3.Error):
+                    cached_data = None
+                if cached_data is not None:
+                    merge(os.path.relpath(path, start_path), cached_data)
+                    continue
+            yield path
+        search_finished = True
+        if progress: progress(files_done, files_found, search_finished)
+
+    log(f"Начинаю поиск файлов c '{FILENAME_FILTER_KEYWORD}' в названии (глубина {max_depth})...")
+    cache = None
+    if cache_path:
+        # Кэш — необязательное ускорение: если файл кэша недоступен (занят, поврежден), разбираем без него
+        try:
+            cache = ResultCache(cache_path, config_fingerprint(docx_backend, doc_backend))
+        except sqlite3.Error as e:
+            log(f"  > Кэш результатов недоступен ({cache_path}: {e}), все файлы будут разобраны.")
+    index = None
+    if index_path:
+        try:
+            index = line_index.LineIndex(index_path, config_fingerprint(docx_backend, doc_backend))
+        except sqlite3.Error as e:
+            log(f"  > Индекс строк недоступен ({index_path}: {e}), строки не будут сохранены.")
+    try:
+        parse_files(start_path, discovered_files(), merge, log, max_workers, docx_backend, doc_backend, cache, cancel_event,
+                    run_metrics, profile_dir, index)
+    finally:
+        if cancel_event is not None and cancel_event.is_set():
+            log(f"\nАнализ отменен: обработано {files_done} из {files_found} найденных файлов.")
+        log(f"\nНайдено файлов: {files_found}")
+        if cache is not None:
+            try:
+                cache.close(start_path)
+            except sqlite3.Error as e:
+                log(f"  > Не удалось сохранить кэш результатов {cache_path}: {e}")
+            log(f"Кэш: {cache.hits} файлов взято из кэша, {cache.misses} разобрано заново.")
+        if index is not None:
+            try:
+                index.close(start_path)
+                log(f"Индекс строк: обновлено файлов {index.files_replaced}, строк {index.rows_replaced} ({index_path}).")
+            except sqlite3.Error as e:
+                log(f"  > Не удалось сохранить индекс строк {index_path}: {e}")
+        run_metrics.log_summary(log)
+        if metrics_path:
+            try:
+                run_metrics.write(metrics_path)
+                log(f"Метрики сохранены: {metrics_path}")
+            except OSError as e:
+                log(f"  > Не удалось сохранить метрики {metrics_path}: {e}")
+
+    return store
+
+def parse_files(start_path, files, merge, log, max_workers, docx_backend, doc_backend, cache=None, cancel_event=None,
+                run_metrics=None, profile_dir=None, index=None, pools=None):
+    """
+    Разбирает файлы из итератора files по мере их поступления в пулах обработчиков (WorkerPool):
+    .doc при doc_backend из DOC_BACKENDS — в своем пуле с прогретым Word/LibreOffice, остальные —
+    средствами Python (при max_workers <= 1 — в текущем процессе). Результаты передаются в merge
+    (для каждого файла, при критической ошибке — с данными None), метрики разбора — в run_metrics.
+    Файлы формата, для которого не установлена нужная библиотека, пропускаются с сообщением в логе.
+    После cancel_event.set() ожидающие задачи отменяются.
+    Если задан index (line_index.LineIndex), учтенные строки каждого разобранного файла сохраняются в нем.
+    pools — словарь пулов {бэкенд: WorkerPool} для повторного использования между вызовами (например,
+    в режиме наблюдения): созданные пулы добавляются в него и не останавливаются, останавливает их вызывающий.
+    """
+    def store(path, file_specific_data, state):
+        # Результаты с ошибками не кэшируются: файл мог быть временно недоступен; без state — файл менялся во время разбора
+        if cache is not None and state is not None:
+            try: cache.put(path, dict(file_specific_data), state)
+            except sqlite3.Error: pass
+
+    def handle_result(path, result):
+        relative_path = os.path.relpath(path, start_path)
+        file_ext = os.path.splitext(path)[1].lower()
+        file_path_res, file_specific_data, messages, file_metrics, line_items, state = result
+        log(f"\n[{file_ext.upper().replace('.', '')}] Обработка: {relative_path}")
+        for message in messages:
+            log(message)
+        if not messages:
+            store(path, file_specific_data, state)
+        if run_metrics is not None:
+            run_metrics.add(relative_path, file_metrics)
+        if index is not None:
+            # Файл с ошибками остается в индексе неактуальным и будет разобран при следующем запуске
+            try: index.replace_file(path, line_items, complete=not messages and state is not None, state=state)
+            except (OSError, sqlite3.Error): pass
+        merge(relative_path, file_specific_data)
+
+    def handle_future(future):
+        path = future_to_path.pop(future)
+        try:
+            handle_result(path, future.result())
+        except Exception as exc:
+            log(f"\nКРИТИЧЕСКАЯ ОШИБКА при обработке файла {os.path.relpath(path, start_path)}: {exc}")
+            merge(os.path.relpath(path, start_path), None)
+
+    def cancelled():
+        return cancel_event is not None and cancel_event.is_set()
+
+    def unavailable(path):
+        # Проверяется один раз на расширение (для .docx — на способ чтения), при первом файле этого формата
+        file_ext = os.path.splitext(path)[1].lower()
+        file_docx_backend = docx_backend_for(path, docx_backend) if file_ext == '.docx' else docx_backend
+        key = (file_ext, file_docx_backend)
+        if key not in missing:
+            missing[key] = missing_requirements(file_ext, file_docx_backend, doc_backend)
+            if missing[key]:
+                described = file_ext if file_docx_backend == docx_backend else f"{file_ext} (способ чтения {file_docx_backend})"
+                log(f"\n  > Файлы {described} будут пропущены: {missing[key]}")
+        if missing[key]:
+            skipped[key] += 1
+            return True
+        return False
+
+    def pool_for(path):
+        if path.lower().endswith('.doc') and doc_backend in DOC_BACKENDS:
+            backend_name, backend_factory = doc_backend, functools.partial(
+                DOC_BACKENDS[doc_backend], profile_dir=profile_dir, index_lines=index is not None, with_state=with_state)
+        elif max_workers > 1:
+            backend_name, backend_factory = 'python', functools.partial(PythonBackend, docx_backend, profile_dir, index is not None, with_state)
+        else:
+            return None
+        if backend_name not in pools:
+            pools[backend_name] = WorkerPool(
+                backend_factory, max_workers, max_tasks=WORKER_MAX_TASKS,
+                max_memory_mb=WORKER_MAX_MEMORY_MB, task_timeout=FILE_TIMEOUT
+            )
+        return pools[backend_name]
+
+    own_pools = pools is None
+    if own_pools: pools = {}
+    # Состояние файлов (с хэшем — для кэша) снимают процессы-обработчики до чтения, а не этот поток после разбора
+    with_state = 'hash' if cache is not None else 'stat' if index is not None else None
+    missing = {}
+    skipped = defaultdict(int)
+    future_to_path = {}
+    completed = queue.Queue()  # Готовые задачи обрабатываются, не дожидаясь конца поиска файлов
+    try:
+        for path in files:
+            if cancelled(): break
+            if unavailable(path):
+                merge(os.path.relpath(path, start_path), None)
+                continue
+            pool = pool_for(path)
+            if pool is None:
+                handle_result(path, parse_file_in_process(path, docx_backend, profile_dir, index is not None, with_state))
+                continue
+            future = pool.submit(path)
+            future_to_path[future] = path
+            future.add_done_callback(completed.put)
+            while not completed.empty():
+                handle_future(completed.get())
+
+        while future_to_path and not cancelled():
+            try:
+                handle_future(completed.get(timeout=0.2))
+            except queue.Empty:
+                continue
+    finally:
+        if own_pools:
+            for pool in pools.values():
+                pool.shutdown(cancel_futures=True)
+        for key, count in sorted(skipped.items()):
+            log(f"\nПропущено файлов {key[0]}: {count} ({missing[key]}).")
+        if own_pools:
+            log_pool_restarts(pools, log)
+
+def log_pool_restarts(pools, log=print):
+    for backend_name, pool in pools.items():
+        if pool.restarts or pool.timeouts or pool.crashes:
+            log(f"\nОбработчики ({backend_name}): плановых перезапусков {pool.restarts}, "
+                f"по таймауту {pool.timeouts}, аварийных {pool.crashes}.")
+
+def log_report(store, log=print):
+    log("\n-------------------------------------------")
+    log("--- РАСЧЕТ ПО КАЖДОМУ ФАЙЛУ ---")
+
+    if not len(store):
+        log(f"Материалы не найдены.")
+    else:
+        for filename, sorted_materials in store.iter_files():
+            log(f"\n===========================================\nФАЙЛ: {filename}")
+            if not sorted_materials:
+                log("  > В этом файле не найдено подходящих материалов.")
+                continue
+
+            for i, (material, total_length) in enumerate(sorted_materials, 1):
+                final_length_with_contingency = total_length * (1 + CONTINGENCY_PERCENTAGE / 100)
+                if material.startswith("Арматура d"):
+                    length_str = f"{final_length_with_contingency:.3f}".replace('.', ',')
+                    log(f"{i}. {material} {length_str}м")
+                else:
+                    log(f"{i}. Наименование: {material}")
+                    log(f"   - Суммарная длина (без запаса): {total_length:.3f} м")
+                    log(f"   - Итоговая длина с запасом ({CONTINGENCY_PERCENTAGE}%): {final_length_with_contingency:.3f} м")
+
+    log_grand_total(store, log)
+
+def log_grand_total(store, log=print, sorted_grand_totals=None):
+    # sorted_grand_totals — уже посчитанный итог (например, обновляемый разностью в режиме наблюдения)
+    log("\n\n###########################################")
+    log("--- ОБЩИЙ ИТОГ ПО ВСЕМ ФАЙЛАМ ---")
+    log("###########################################\n")
+
+    if sorted_grand_totals is None:
+        sorted_grand_totals = store.grand_total()
+    if not sorted_grand_totals:
+        log("Материалы для итогового подсчета не найдены.")
+    else:
+        log(f"Общая спецификация (с учетом {CONTINGENCY_PERCENTAGE}% запаса):\n")
+        for i, (material, total_length) in enumerate(sorted_grand_totals, 1):
+            final_length_with_contingency = total_length * (1 + CONTINGENCY_PERCENTAGE / 100)
+            if material.startswith("Арматура d"):
+                length_str = f"{final_length_with_contingency:.3f}".replace('.', ',')
+                log(f'{i}. {material}: {length_str} м')
+            else:
+                length_str = f"{final_length_with_contingency:.3f}".replace('.', ',')
+                log(f'{i}. Профиль {material}: {length_str} м')
+
+def export_results(store, file_path, log=print):
+    """Сохраняет отчет по файлам, подпапкам и общий итог в .xlsx/.csv. Возвращает True при успехе."""
+    started = time.perf_counter()
+    try:
+        rows = export_report(store, file_path, CONTINGENCY_PERCENTAGE)
+    except Exception as e:
+        log(f"  > Не удалось сохранить отчет {file_path}: {e}")
+        return False
+    log(f"\nОтчет сохранен: {file_path} ({len(store)} файлов, {rows} строк, {time.perf_counter() - started:.2f} с)")
+    return True
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Подсчет длин материалов по журналам (.xlsx, .docx, .doc) без GUI.")
+    arg_parser.add_argument("folder", help="папка для поиска журналов")
+    arg_parser.add_argument("-j", "--workers", type=int, default=default_workers(),
+                            help="число процессов для разбора файлов (1 — без пула процессов)")
+    arg_parser.add_argument("--docx-backend", choices=sorted(DOCX_PARSERS), default=DOCX_BACKEND,
+                            help="способ чтения .docx (для отдельных файлов — DOCX_BACKEND_BY_GLOB)")
+    arg_parser.add_argument("--doc-backend", choices=['binary'] + sorted(DOC_BACKENDS), default=DOC_BACKEND,
+                            help="способ чтения .doc: напрямую из файла, через MS Word или LibreOffice")
+    arg_parser.add_argument("--depth", type=int, default=SEARCH_MAX_DEPTH, help="глубина поиска (1 — только указанная папка)")
+    arg_parser.add_argument("--include", action="append", default=list(INCLUDE_GLOBS), help="glob-шаблон имени файла для отбора (можно несколько)")
+    arg_parser.add_argument("--exclude", action="append", default=list(EXCLUDE_GLOBS), help="glob-шаблон имени файла для исключения (можно несколько)")
+    arg_parser.add_argument("--cache", default=CACHE_FILE, help="файл кэша результатов (SQLite)")
+    arg_parser.add_argument("--no-cache", action="store_true", help="не использовать кэш результатов")
+    arg_parser.add_argument("--export", help="сохранить отчет в .xlsx или .csv; на экран тогда выводится только общий итог")
+    arg_parser.add_argument("--metrics", help="сохранить метрики разбора по файлам в JSON (или CSV, если имя оканчивается на .csv)")
+    arg_parser.add_argument("--watch", action="store_true", help="после разбора следить за папкой и обновлять итог при изменениях файлов")
+    arg_parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="секунд между опросами папки в режиме --watch")
+    arg_parser.add_argument("--index", help="сохранять учтенные строки в индекс SQLite для запросов (см. line_index.py)")
+    arg_parser.add_argument("--profile-dir", help="профилировать разбор каждого файла (cProfile) и сохранить .prof в эту папку")
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        print(f"Ошибка: папка не найдена: {args.folder}", file=sys.stderr)
+        return 1
+    if args.watch:
+        from watch_mode import watch
+        watch(args.folder, interval=args.interval, export_path=args.export, max_workers=args.workers,
+              docx_backend=args.docx_backend, doc_backend=args.doc_backend, cache_path=None if args.no_cache else args.cache,
+              max_depth=args.depth, include=args.include, exclude=args.exclude, index_path=args.index)
+        return 0
+    store = run_analysis(
+        args.folder, max_workers=args.workers, docx_backend=args.docx_backend, doc_backend=args.doc_backend,
+        cache_path=None if args.no_cache else args.cache,
+        max_depth=args.depth, include=args.include, exclude=args.exclude,
+        metrics_path=args.metrics, profile_dir=args.profile_dir, index_path=args.index
+    )
+    if args.export and export_results(store, args.export):
+        log_grand_total(store)
+    else:
+        log_report(store)
+    print("\n\n--- Анализ завершен. ---")
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
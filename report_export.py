@@ -0,0 +1,61 @@
+import csv
+
+# Выгрузка итогов (AggregationStore) в .xlsx или .csv: по файлам, по подпапкам и общий итог,
+# длины без запаса и с запасом. Строки пишутся по мере выдачи хранилищем (openpyxl write_only,
+# csv.writer), поэтому память не зависит от числа строк в отчете.
+
+def _with_contingency(length, contingency_percentage):
+    return length * (1 + contingency_percentage / 100)
+
+def export_rows(store, contingency_percentage):
+    """Выдает (раздел, файл/подпапка, №, материал, длина без запаса, длина с запасом) для всего отчета."""
+    for filename, materials in store.iter_files():
+        for i, (material, total_length) in enumerate(materials, 1):
+            yield 'Файл', filename, i, material, total_length, _with_contingency(total_length, contingency_percentage)
+    for folder, materials in store.folder_totals():
+        for i, (material, total_length) in enumerate(materials, 1):
+            yield 'Подпапка', folder or '.', i, material, total_length, _with_contingency(total_length, contingency_percentage)
+    for i, (material, total_length) in enumerate(store.grand_total(), 1):
+        yield 'Итог', '', i, material, total_length, _with_contingency(total_length, contingency_percentage)
+
+def _header(contingency_percentage, place):
+    return [place, '№', 'Материал', 'Длина без запаса, м', f'Длина с запасом {contingency_percentage}%, м']
+
+def export_xlsx(store, file_path, contingency_percentage):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    sheets = {
+        'Файл': workbook.create_sheet('По файлам'),
+        'Подпапка': workbook.create_sheet('По подпапкам'),
+        'Итог': workbook.create_sheet('Общий итог'),
+    }
+    sheets['Файл'].append(_header(contingency_percentage, 'Файл'))
+    sheets['Подпапка'].append(_header(contingency_percentage, 'Подпапка'))
+    sheets['Итог'].append(_header(contingency_percentage, '')[1:])
+    for sheet in sheets.values():
+        sheet.column_dimensions['A'].width = 60
+    rows = 0
+    for section, place, i, material, total_length, final_length in export_rows(store, contingency_percentage):
+        values = [i, material, round(total_length, 3), round(final_length, 3)]
+        sheets[section].append(values if section == 'Итог' else [place] + values)
+        rows += 1
+    workbook.save(file_path)
+    return rows
+
+def export_csv(store, file_path, contingency_percentage):
+    # ';' и десятичная запятая — как ожидает Excel с русскими региональными настройками
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Раздел'] + _header(contingency_percentage, 'Файл / подпапка'))
+        rows = 0
+        for section, place, i, material, total_length, final_length in export_rows(store, contingency_percentage):
+            writer.writerow([section, place, i, material,
+                             f"{total_length:.3f}".replace('.', ','), f"{final_length:.3f}".replace('.', ',')])
+            rows += 1
+    return rows
+
+def export_report(store, file_path, contingency_percentage):
+    """Сохраняет отчет в file_path (.csv — в CSV, иначе в .xlsx). Возвращает число записанных строк."""
+    if file_path.lower().endswith('.csv'):
+        return export_csv(store, file_path, contingency_percentage)
+    return export_xlsx(store, file_path, contingency_percentage)
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+# Постоянный кэш результатов разбора: путь к файлу -> словарь материал -> длина.
+# Запись считается действительной, если совпадает отпечаток конфигурации и файл не изменился:
+# при тех же размере и mtime файл не перечитывается, при другом mtime сверяется хэш содержимого.
+# Файлом кэша могут одновременно пользоваться несколько процессов (GUI и CLI, шарды на одной машине):
+# журнал WAL не блокирует чтение, а изменения копятся в памяти и записываются короткими транзакциями,
+# поэтому блокировка на запись не держится во время разбора.
+# Записи хранятся по (путь, отпечаток): запуски с разными настройками (GUI и CLI с --docx-backend) не вытесняют
+# результаты друг друга, а записи устаревших настроек уходят по давности использования (max_entries).
+
+CACHE_SCHEMA_VERSION = 2
+CACHE_MAX_ENTRIES = 100000
+CACHE_COMMIT_EVERY = 100  # Записей между фиксациями транзакции (прерванный запуск не теряет весь кэш)
+CACHE_BUSY_TIMEOUT = 30  # Секунд ожидания, пока файл кэша занят записью другого процесса
+
+def file_content_hash(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_state(file_path, with_hash=True):
+    """(размер, mtime_ns, хэш содержимого) файла; хэш — None при with_hash=False."""
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns, file_content_hash(file_path) if with_hash else None
+
+class ResultCache:
+    def __init__(self, db_path, fingerprint, max_entries=CACHE_MAX_ENTRIES):
+        self.fingerprint = f"{CACHE_SCHEMA_VERSION}:{fingerprint}"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.pending_puts = []
+        self.pending_touches = []
+        self.run_started = time.time()
+        self.connection = sqlite3.connect(db_path, timeout=CACHE_BUSY_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("DROP TABLE IF EXISTS files")  # схема версии 1: одна запись на путь
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " path TEXT, fingerprint TEXT, size INTEGER, mtime_ns INTEGER, content_hash TEXT,"
+            " data TEXT, last_used REAL, PRIMARY KEY (path, fingerprint))"
+        )
+        self.connection.commit()
+
+    def get(self, file_path):
+        """Возвращает сохраненный словарь материалов или None, если файл нужно разобрать заново."""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self.connection.execute(
+            "SELECT size, mtime_ns, content_hash, data FROM results WHERE path = ? AND fingerprint = ?",
+            (path, self.fingerprint)
+        ).fetchone()
+        if row is not None:
+            size, mtime_ns, content_hash, data = row
+            unchanged = size == stat.st_size and mtime_ns == stat.st_mtime_ns
+            if not unchanged and size == stat.st_size and content_hash == file_content_hash(path):
+                unchanged = True  # файл "тронули", но содержимое то же
+            if unchanged:
+                self.pending_touches.append((stat.st_mtime_ns, time.time(), path, self.fingerprint))
+                self._flush_if_full()
+                self.hits += 1
+                return json.loads(data)
+        self.misses += 1
+        return None
+
+    def put(self, file_path, file_data, state):
+        """
+        Сохраняет результат разбора. state — file_state, снятый процессом-обработчиком до чтения файла:
+        файл не перечитывается повторно, а сохраненный во время разбора не получит старые итоги под новым хэшем.
+        """
+        size, mtime_ns, content_hash = state
+        self.pending_puts.append((os.path.abspath(file_path), size, mtime_ns, content_hash, self.fingerprint,
+                                  json.dumps(file_data, ensure_ascii=False), time.time()))
+        self._flush_if_full()
+
+    def _flush_if_full(self):
+        if len(self.pending_puts) + len(self.pending_touches) >= CACHE_COMMIT_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Записывает накопленные изменения одной короткой транзакцией."""
+        puts, touches = self.pending_puts, self.pending_touches
+        self.pending_puts, self.pending_touches = [], []
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results (path, size, mtime_ns, content_hash, fingerprint, data, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)", puts
+            )
+            self.connection.executemany(
+                "UPDATE results SET mtime_ns = ?, last_used = ? WHERE path = ? AND fingerprint = ?", touches
+            )
+
+    def prune(self, root=None):
+        """
+        Удаляет устаревшие записи: для исчезнувших файлов (среди не использованных в этом запуске, при любых
+        настройках) и самые давно использованные сверх max_entries — в том числе записи других настроек.
+        Исчезновение проверяется только для файлов внутри папки root (без root — не проверяется):
+        кэш общий для всех архивов, и файлы другого, например неподключенного сетевого, архива не трогаются.
+        """
+        unused = []
+        if root is not None:
+            prefix = os.path.join(os.path.abspath(root), '')
+            unused = self.connection.execute(
+                "SELECT DISTINCT path FROM results WHERE last_used < ? AND substr(path, 1, ?) = ?",
+                (self.run_started, len(prefix), prefix)
+            ).fetchall()
+        self.connection.executemany(
+            "DELETE FROM results WHERE path = ?", [(path,) for (path,) in unused if not os.path.exists(path)]
+        )
+        self.connection.execute(
+            "DELETE FROM results WHERE rowid NOT IN (SELECT rowid FROM results ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self.connection.commit()
+
+    def close(self, root=None):
+        """Сохраняет накопленные изменения, чистит записи (см. prune) и закрывает файл кэша."""
+        try:
+            self.flush()
+            self.prune(root)
+        finally:
+            self.connection.close()
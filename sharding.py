@@ -0,0 +1,231 @@
+"""
+Распределенный запуск: архив делится на шарды, каждый шард разбирается отдельно (в своем процессе
+или на своей машине) и сохраняет частичный результат, а reduce сводит частичные результаты в общий отчет.
+
+  python sharding.py plan  <папка> --shards 4 --output manifest.tsv     # (необязательно) план по размерам файлов
+  python sharding.py map   <папка> --shard 0/4 --output part-0.json [--manifest manifest.tsv]
+  python sharding.py reduce part-*.json [--export отчет.xlsx]
+  python sharding.py local <папка> --shards 4 --output-dir parts      # map в 4 процессах + reduce
+                                                                      # (у каждого шарда свой кэш parts/cache-N.sqlite)
+
+Без манифеста файл попадает в шард по хэшу относительного пути, поэтому шарды на разных машинах
+делят архив одинаково, даже если он смонтирован по разным путям. Частичный результат записывается
+атомарно в конце шарда: если файла нет, шард не завершился, и перезапустить нужно только его.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import argparse
+import subprocess
+import multiprocessing
+from aggregation_store import AggregationStore
+from parser_engine import (
+    PARSER_VERSION, CACHE_FILE, DOCX_BACKEND, DOC_BACKEND, SEARCH_MAX_DEPTH,
+    natural_sort_key, config_fingerprint, default_workers, find_files, run_analysis,
+    log_report, log_grand_total, export_results,
+)
+
+PARTIAL_FORMAT = 'journal-parser-partial'
+PARTIAL_FORMAT_VERSION = 1
+
+def relative_key(relative_path):
+    # Один и тот же ключ файла на Windows и Linux
+    return relative_path.replace(os.sep, '/')
+
+def shard_of(relative_path, shard_count):
+    digest = hashlib.sha1(relative_key(relative_path).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+def plan_shards(start_path, shard_count, max_depth=SEARCH_MAX_DEPTH):
+    """Раскладывает файлы по шардам с выравниванием суммарного размера (сначала самые большие)."""
+    sizes = []
+    for path in find_files(start_path, max_depth):
+        try: size = os.path.getsize(path)
+        except OSError: size = 0
+        sizes.append((size, relative_key(os.path.relpath(path, start_path))))
+    loads = [0] * shard_count
+    manifest = []
+    for size, relative_path in sorted(sizes, reverse=True):
+        shard_index = loads.index(min(loads))
+        loads[shard_index] += size
+        manifest.append((shard_index, relative_path))
+    return sorted(manifest, key=lambda item: (item[0], natural_sort_key(item[1])))
+
+def write_manifest(manifest, file_path):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        for shard_index, relative_path in manifest:
+            f.write(f"{shard_index}\t{relative_path}\n")
+
+def read_manifest(file_path, shard_index):
+    """Относительные пути файлов шарда shard_index из манифеста (строки "номер<TAB>путь")."""
+    selected = set()
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip(): continue
+            index, relative_path = line.rstrip('\n').split('\t', 1)
+            if int(index) == shard_index:
+                selected.add(relative_path)
+    return selected
+
+def write_atomic_json(data, file_path):
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, file_path)
+
+def run_shard(start_path, shard_index, shard_count, output_path, manifest_path=None, log=print, **analysis_options):
+    """Разбирает файлы одного шарда и сохраняет частичный результат в output_path (JSON)."""
+    if manifest_path:
+        selected = read_manifest(manifest_path, shard_index)
+        file_filter = lambda relative_path: relative_key(relative_path) in selected
+    else:
+        file_filter = lambda relative_path: shard_of(relative_path, shard_count) == shard_index
+    started = time.time()
+    store = run_analysis(start_path, log, file_filter=file_filter, **analysis_options)
+    partial = {
+        'format': PARTIAL_FORMAT,
+        'format_version': PARTIAL_FORMAT_VERSION,
+        'parser_version': PARSER_VERSION,
+        'config_fingerprint': config_fingerprint(
+            analysis_options.get('docx_backend', DOCX_BACKEND), analysis_options.get('doc_backend', DOC_BACKEND)),
+        'shard': {'index': shard_index, 'count': shard_count, 'manifest': os.path.basename(manifest_path) if manifest_path else None},
+        'start_path': os.path.abspath(start_path),
+        'host': socket.gethostname(),
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)),
+        'seconds': round(time.time() - started, 3),
+        'files': {relative_key(relative_path): dict(materials) for relative_path, materials in store.iter_files()},
+    }
+    write_atomic_json(partial, output_path)
+    log(f"Шард {shard_index + 1}/{shard_count}: {len(store)} файлов с материалами сохранено в {output_path}")
+    return partial
+
+def merge_partials(partial_paths, log=print):
+    """
+    Сводит частичные результаты в AggregationStore. Предупреждает о разных версиях/настройках разбора,
+    о файлах, встретившихся в нескольких шардах (берется последний), и о шардах, которых не хватает.
+    """
+    store = AggregationStore(natural_sort_key)
+    fingerprints = set()
+    shards_seen = {}
+    for partial_path in partial_paths:
+        with open(partial_path, encoding='utf-8') as f:
+            partial = json.load(f)
+        if partial.get('format') != PARTIAL_FORMAT or partial.get('format_version') != PARTIAL_FORMAT_VERSION:
+            raise ValueError(f"{partial_path}: не частичный результат парсера журналов")
+        fingerprints.add((partial['parser_version'], partial['config_fingerprint']))
+        shard = partial['shard']
+        shards_seen.setdefault(shard['count'], set()).add(shard['index'])
+        for relative_path, file_data in partial['files'].items():
+            if relative_path in store:
+                log(f"  > Файл {relative_path} есть в нескольких частичных результатах, взят из {partial_path}")
+            store.add_file(relative_path, file_data)
+    if len(fingerprints) > 1:
+        log("  > Внимание: частичные результаты получены разными версиями или настройками парсера.")
+    for shard_count, indices in sorted(shards_seen.items()):
+        missing = sorted(set(range(shard_count)) - indices)
+        if missing:
+            log(f"  > Нет результатов шардов: {', '.join(str(i) for i in missing)} (из {shard_count}) — итог неполный.")
+    return store
+
+def run_local(start_path, shard_count, output_dir, workers_per_shard=None, manifest_path=None, use_cache=True):
+    """
+    Запускает map всех шардов отдельными процессами этой машины; возвращает пути частичных результатов.
+    Каждый шард пишет в свой кэш в output_dir (cache-N.sqlite), чтобы процессы не ждали друг друга
+    на одном файле SQLite; при разбиении по хэшу пути шард и в следующий раз получит те же файлы.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if workers_per_shard is None:
+        workers_per_shard = max(1, default_workers() // shard_count)
+    processes = []
+    for shard_index in range(shard_count):
+        output_path = os.path.join(output_dir, f"part-{shard_index}.json")
+        command = [sys.executable, os.path.abspath(__file__), 'map', start_path, '--shard', f"{shard_index}/{shard_count}",
+                   '--output', output_path, '-j', str(workers_per_shard)]
+        if use_cache:
+            command += ['--cache', os.path.join(output_dir, f"cache-{shard_index}.sqlite")]
+        else:
+            command += ['--no-cache']
+        if manifest_path:
+            command += ['--manifest', manifest_path]
+        log_file = open(os.path.join(output_dir, f"part-{shard_index}.log"), 'w', encoding='utf-8')
+        processes.append((shard_index, output_path, log_file, subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)))
+    outputs = []
+    for shard_index, output_path, log_file, process in processes:
+        process.wait()
+        log_file.close()
+        if process.returncode == 0 and os.path.exists(output_path):
+            outputs.append(output_path)
+        else:
+            print(f"  > Шард {shard_index} завершился с ошибкой (код {process.returncode}), см. {log_file.name}", file=sys.stderr)
+    return outputs
+
+def parse_shard(text):
+    index, count = (int(part) for part in text.split('/'))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("ожидается НОМЕР/ЧИСЛО, 0 <= НОМЕР < ЧИСЛО")
+    return index, count
+
+def report(store, export_path):
+    if export_path and export_results(store, export_path):
+        log_grand_total(store)
+    else:
+        log_report(store)
+    print("\n\n--- Анализ завершен. ---")
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    plan = commands.add_parser('plan', help="составить манифест шардов с выравниванием по размеру файлов")
+    plan.add_argument("folder")
+    plan.add_argument("--shards", type=int, required=True)
+    plan.add_argument("--output", required=True, help="файл манифеста")
+    plan.add_argument("--depth", type=int, default=SEARCH_MAX_DEPTH)
+
+    shard_map = commands.add_parser('map', help="разобрать один шард и сохранить частичный результат")
+    shard_map.add_argument("folder")
+    shard_map.add_argument("--shard", type=parse_shard, required=True, help="НОМЕР/ЧИСЛО, например 0/4")
+    shard_map.add_argument("--output", required=True, help="файл частичного результата (JSON)")
+    shard_map.add_argument("--manifest", help="манифест шардов (иначе — по хэшу пути)")
+    shard_map.add_argument("-j", "--workers", type=int, default=default_workers())
+    shard_map.add_argument("--depth", type=int, default=SEARCH_MAX_DEPTH)
+    shard_map.add_argument("--cache", default=CACHE_FILE, help="файл кэша результатов (SQLite)")
+    shard_map.add_argument("--no-cache", action="store_true")
+
+    reduce = commands.add_parser('reduce', help="свести частичные результаты в отчет")
+    reduce.add_argument("partials", nargs='+')
+    reduce.add_argument("--export", help="сохранить отчет в .xlsx или .csv")
+
+    local = commands.add_parser('local', help="map всех шардов в отдельных процессах и reduce")
+    local.add_argument("folder")
+    local.add_argument("--shards", type=int, default=2)
+    local.add_argument("--output-dir", required=True)
+    local.add_argument("--manifest")
+    local.add_argument("-j", "--workers", type=int, help="процессов на шард (по умолчанию — ядра поровну)")
+    local.add_argument("--no-cache", action="store_true")
+    local.add_argument("--export", help="сохранить отчет в .xlsx или .csv")
+    args = arg_parser.parse_args(argv)
+
+    if args.command == 'plan':
+        manifest = plan_shards(args.folder, args.shards, args.depth)
+        write_manifest(manifest, args.output)
+        print(f"Манифест: {len(manifest)} файлов в {args.shards} шардах -> {args.output}")
+    elif args.command == 'map':
+        shard_index, shard_count = args.shard
+        run_shard(args.folder, shard_index, shard_count, args.output, args.manifest,
+                  max_workers=args.workers, max_depth=args.depth, cache_path=None if args.no_cache else args.cache)
+    elif args.command == 'reduce':
+        report(merge_partials(args.partials), args.export)
+    elif args.command == 'local':
+        outputs = run_local(args.folder, args.shards, args.output_dir, args.workers, args.manifest, not args.no_cache)
+        report(merge_partials(outputs), args.export)
+        if len(outputs) < args.shards:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
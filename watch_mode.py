@@ -0,0 +1,179 @@
+import os
+import time
+import sqlite3
+from parser_engine import (
+    DOCX_BACKEND, DOC_BACKEND, SEARCH_MAX_DEPTH, INCLUDE_GLOBS, EXCLUDE_GLOBS, WATCH_INTERVAL,
+    find_journal_files, config_fingerprint, parse_files, run_analysis, log_grand_total, export_results, log_pool_restarts,
+)
+from result_cache import ResultCache
+from line_index import LineIndex
+
+# Режим наблюдения: после полного разбора папка периодически опрашивается (снимки mtime/размер файлов,
+# без API файловой системы конкретной ОС), и заново разбираются только добавленные и измененные файлы.
+# Общий итог обновляется разностью: вклад файла до изменения вычитается, новый вклад прибавляется.
+
+def take_snapshot(start_path, max_depth=SEARCH_MAX_DEPTH, include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS, on_error=None):
+    """
+    {путь: (mtime_ns, размер)} для всех журналов в папке; stat берется из обхода (DirEntry), без отдельного os.stat.
+    Недоступные подпапки передаются в on_error(path, error), недоступность самой start_path — OSError.
+    """
+    return {
+        path: (stat.st_mtime_ns, stat.st_size)
+        for path, stat in find_journal_files(start_path, max_depth, include, exclude, on_error, with_stat=True)
+    }
+
+def diff_snapshots(old, new):
+    """Возвращает (добавленные, измененные, удаленные) пути."""
+    added = [path for path in new if path not in old]
+    changed = [path for path in new if path in old and new[path] != old[path]]
+    deleted = [path for path in old if path not in new]
+    return added, changed, deleted
+
+class JournalWatcher:
+    """
+    Держит итоги по файлам (AggregationStore) и общий итог в актуальном состоянии при изменениях в папке.
+    grand_totals обновляется разностью вкладов, а не пересчетом по всем файлам; счетчик ссылок на материал
+    позволяет убрать материал из итога, когда он больше не встречается ни в одном файле.
+    Кэш, индекс строк и пул обработчиков открываются один раз и живут до close(): опрос с изменениями
+    не платит за их открытие, запуск процессов и очистку (prune) кэша и индекса.
+    """
+
+    def __init__(self, start_path, log=print, max_workers=None, docx_backend=DOCX_BACKEND, doc_backend=DOC_BACKEND,
+                 cache_path=None, max_depth=SEARCH_MAX_DEPTH, include=INCLUDE_GLOBS, exclude=EXCLUDE_GLOBS, index_path=None):
+        self.start_path = start_path
+        self.log = log
+        self.max_workers = max_workers
+        self.docx_backend = docx_backend
+        self.doc_backend = doc_backend
+        self.cache_path = cache_path
+        self.max_depth = max_depth
+        self.include = include
+        self.exclude = exclude
+        self.index_path = index_path
+        self.snapshot = {}
+        self.unavailable = False  # папка не читалась при прошлом опросе
+        self.cache = None
+        self.index = None
+        self.pools = {}
+        self.store = None
+        self.grand_totals = {}
+        self.material_files = {}  # материал -> в скольких файлах встречается
+
+    def start(self):
+        # Снимок до полного разбора: файл, измененный во время разбора, попадет в первое же обновление
+        self.snapshot = take_snapshot(self.start_path, self.max_depth, self.include, self.exclude)
+        self.store = run_analysis(
+            self.start_path, self.log, self.max_workers, self.docx_backend, self.doc_backend,
+            cache_path=self.cache_path, max_depth=self.max_depth, include=self.include, exclude=self.exclude,
+            index_path=self.index_path
+        )
+        fingerprint = config_fingerprint(self.docx_backend, self.doc_backend)
+        # Кэш и индекс, как и в run_analysis, — необязательны: без них наблюдение продолжается
+        if self.cache_path:
+            try:
+                self.cache = ResultCache(self.cache_path, fingerprint)
+            except sqlite3.Error as e:
+                self.log(f"  > Кэш результатов недоступен ({self.cache_path}: {e}), наблюдение — без кэша.")
+        if self.index_path:
+            try:
+                self.index = LineIndex(self.index_path, fingerprint)
+            except sqlite3.Error as e:
+                self.log(f"  > Индекс строк недоступен ({self.index_path}: {e}), строки не будут сохраняться.")
+        self.grand_totals = dict(self.store.grand_total())
+        for _, materials in self.store.iter_files():
+            for material, _ in materials:
+                self.material_files[material] = self.material_files.get(material, 0) + 1
+        return self.store
+
+    def _apply(self, relative_path, file_specific_data):
+        old_data = self.store.remove_file(relative_path)
+        self.store.add_file(relative_path, file_specific_data)
+        for material, length in old_data.items():
+            self.material_files[material] -= 1
+            if self.material_files[material]:
+                self.grand_totals[material] -= length
+            else:
+                del self.material_files[material], self.grand_totals[material]
+        for material, length in (file_specific_data or {}).items():
+            self.material_files[material] = self.material_files.get(material, 0) + 1
+            self.grand_totals[material] = self.grand_totals.get(material, 0.0) + length
+
+    def poll(self):
+        """Один опрос папки: разбирает изменения и возвращает (добавленные, измененные, удаленные) пути."""
+        failed_dirs = []
+        try:
+            new_snapshot = take_snapshot(self.start_path, self.max_depth, self.include, self.exclude,
+                                         on_error=lambda path, error: failed_dirs.append(os.path.join(path, '')))
+        except OSError as e:
+            # Например, на время пропал сетевой диск: итог не трогаем и пробуем на следующем опросе
+            if not self.unavailable:
+                self.log(f"\n  > Папка недоступна ({e}), повтор при следующем опросе.")
+            self.unavailable = True
+            return [], [], []
+        if self.unavailable:
+            self.log("\n  > Папка снова доступна.")
+            self.unavailable = False
+        for path, state in self.snapshot.items():
+            # Файлы в подпапках, которые не удалось прочитать, не считаются удаленными
+            if path not in new_snapshot and any(path.startswith(failed_dir) for failed_dir in failed_dirs):
+                new_snapshot[path] = state
+        added, changed, deleted = diff_snapshots(self.snapshot, new_snapshot)
+        self.snapshot = new_snapshot
+        for path in deleted:
+            self.log(f"\nУдален: {os.path.relpath(path, self.start_path)}")
+            self._apply(os.path.relpath(path, self.start_path), None)
+        to_parse = added + changed
+        if to_parse:
+            try:
+                parse_files(self.start_path, to_parse, self._apply, self.log, self.max_workers or 1, self.docx_backend,
+                            self.doc_backend, self.cache, index=self.index, pools=self.pools)
+            finally:
+                # Изменения сразу видны другим процессам; очистка кэша и индекса — только в close()
+                self._save(lambda storage: storage.flush())
+        return added, changed, deleted
+
+    def _save(self, action):
+        # Ошибка SQLite (например, файл занят дольше таймаута ожидания) не должна останавливать наблюдение
+        for name, storage, path in (('кэш результатов', self.cache, self.cache_path), ('индекс строк', self.index, self.index_path)):
+            if storage is None: continue
+            try:
+                action(storage)
+            except sqlite3.Error as e:
+                self.log(f"  > Не удалось сохранить {name} {path}: {e}")
+
+    def close(self):
+        """Останавливает пул обработчиков, сохраняет и чистит кэш и индекс строк."""
+        for pool in self.pools.values():
+            pool.shutdown(cancel_futures=True)
+        log_pool_restarts(self.pools, self.log)
+        self.pools = {}
+        self._save(lambda storage: storage.close(self.start_path))
+        self.cache = self.index = None
+
+    def sorted_grand_totals(self):
+        rank = self.store.material_rank()
+        material_ids = self.store.material_ids
+        return sorted(self.grand_totals.items(), key=lambda item: rank[material_ids[item[0]]])
+
+def watch(start_path, log=print, interval=WATCH_INTERVAL, export_path=None, **options):
+    """Полный разбор, затем бесконечный опрос папки; после каждого изменения выводит обновленный общий итог."""
+    watcher = JournalWatcher(start_path, log, **options)
+    store = watcher.start()
+    if export_path: export_results(store, export_path, log)
+    log_grand_total(store, log)
+    log(f"\nНаблюдение за {start_path} (опрос каждые {interval} с, Ctrl+C — выход)...")
+    try:
+        while True:
+            started = time.monotonic()
+            added, changed, deleted = watcher.poll()
+            if added or changed or deleted:
+                log(f"\nИзменений: добавлено {len(added)}, изменено {len(changed)}, удалено {len(deleted)} "
+                    f"({time.monotonic() - started:.2f} с)")
+                if export_path: export_results(watcher.store, export_path, log)
+                log_grand_total(watcher.store, log, watcher.sorted_grand_totals())
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        log("\nНаблюдение остановлено.")
+    finally:
+        watcher.close()
+    return watcher.store
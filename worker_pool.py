@@ -0,0 +1,280 @@
+import os
+import sys
+import time
+import signal
+import shutil
+import queue
+import threading
+import multiprocessing
+import multiprocessing.connection
+import concurrent.futures
+
+# Пул долгоживущих процессов-обработчиков с "прогретыми" бэкендами.
+# Бэкенд — объект с методами open() (запуск сессии, например MS Word), parse(file_path) ->
+# (file_data, messages, metrics, line_items, file_state) и close(). Каждый процесс открывает бэкенд один раз и разбирает им много
+# файлов; процесс перезапускается после max_tasks файлов или при превышении max_memory_mb,
+# при падении, а также если файл разбирается дольше task_timeout секунд (процесс убивается).
+# Результаты каждый процесс отправляет по своему каналу (Pipe) синхронно: убитый или упавший процесс
+# не может оставить захваченной блокировку общей очереди, на которой повисли бы остальные.
+# Если бэкенд запускает внешние программы (WINWORD.EXE) или создает временные папки, он может вернуть их
+# методом external_resources() -> (pids, dirs): когда процесс убит по таймауту или упал и close() не был вызван,
+# пул сам завершает эти программы и удаляет папки.
+
+_POLL_INTERVAL = 0.1
+
+def _error_result(file_path, message):
+    return file_path, {}, [f"  > Ошибка при обработке {os.path.basename(file_path)}: {message}"], None, None, None
+
+def _kill_process(pid):
+    try: os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))  # в Windows SIGTERM — TerminateProcess
+    except OSError: pass
+
+def current_memory_mb():
+    """Резидентная память текущего процесса в МБ (None, если узнать нельзя)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return None
+
+def _worker_main(backend_factory, task_queue, connection, worker_id, max_tasks, max_memory_mb):
+    # Ctrl+C получает вся группа процессов; обработчики останавливает пул, а не KeyboardInterrupt
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    backend = backend_factory()
+    try:
+        backend.open()
+    except Exception as e:
+        connection.send(('failed', worker_id, f"не удалось запустить обработчик: {e}"))
+        return
+    if hasattr(backend, 'external_resources'):
+        pids, dirs = backend.external_resources()
+        connection.send(('opened', worker_id, list(pids), list(dirs)))
+    try:
+        tasks_done = 0
+        while True:
+            file_path = task_queue.get()
+            if file_path is None: break
+            try:
+                file_data, messages, file_metrics, line_items, state = backend.parse(file_path)
+                result = ('done', worker_id, file_path, dict(file_data), list(messages), file_metrics, line_items, state)
+            except Exception as e:
+                result = ('error', worker_id, file_path, f"{type(e).__name__}: {e}")
+            tasks_done += 1
+            memory_mb = current_memory_mb() if max_memory_mb else None
+            recycle = (max_tasks and tasks_done >= max_tasks) or (memory_mb is not None and memory_mb > max_memory_mb)
+            connection.send(result + (bool(recycle),))
+            if recycle: break
+    finally:
+        try: backend.close()
+        except Exception: pass
+
+class _Worker:
+    def __init__(self, worker_id, process, task_queue, connection):
+        self.worker_id = worker_id
+        self.process = process
+        self.task_queue = task_queue
+        self.connection = connection  # чтение результатов процесса
+        self.task = None  # (file_path, future, время начала)
+        self.external = ([], [])  # (pids, dirs) из external_resources() бэкенда
+
+class WorkerPool:
+    """
+    Пул процессов с интерфейсом как у Executor: submit(file_path) возвращает Future,
+    результат которого — кортеж (file_path, file_data, messages, metrics, line_items, file_state); metrics,
+    line_items и file_state — None, если файл не был разобран (ошибка, таймаут или падение процесса).
+    Счетчики restarts/timeouts/crashes показывают, сколько раз процессы перезапускались.
+    """
+
+    def __init__(self, backend_factory, workers, max_tasks=None, max_memory_mb=None, task_timeout=None, mp_context=None):
+        self.backend_factory = backend_factory
+        self.workers_count = max(1, workers)
+        self.max_tasks = max_tasks
+        self.max_memory_mb = max_memory_mb
+        self.task_timeout = task_timeout
+        self.context = mp_context or multiprocessing.get_context()
+        self.pending = queue.Queue()
+        self.workers = {}
+        self.next_worker_id = 0
+        self.restarts = self.timeouts = self.crashes = 0
+        self.shutting_down = False
+        self.lock = threading.Lock()  # submit не должен положить задачу после того, как пул разобрал очередь при остановке
+        self.manager = threading.Thread(target=self._manage, daemon=True)
+        self.manager.start()
+
+    def submit(self, file_path):
+        future = concurrent.futures.Future()
+        with self.lock:
+            if self.shutting_down:
+                raise RuntimeError("пул уже остановлен")
+            self.pending.put((file_path, future))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        if cancel_futures:
+            while True:
+                try: _, future = self.pending.get_nowait()
+                except queue.Empty: break
+                future.cancel()
+        self.shutting_down = True
+        if wait:
+            self.manager.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _start_worker(self):
+        """Запускает процесс-обработчик; False, если процесс создать не удалось (нехватка памяти, лимит процессов)."""
+        worker_id = self.next_worker_id
+        self.next_worker_id += 1
+        reader = writer = None
+        try:
+            task_queue = self.context.Queue()
+            reader, writer = self.context.Pipe(duplex=False)
+            process = self.context.Process(
+                target=_worker_main, daemon=True,
+                args=(self.backend_factory, task_queue, writer, worker_id, self.max_tasks, self.max_memory_mb),
+            )
+            process.start()
+        except OSError as e:
+            for connection in (reader, writer):
+                if connection is not None: connection.close()
+            self.crashes += 1
+            if not self.workers:
+                # Разбирать некому: задача получает ошибку, чтобы ее не ждали вечно; следующая — новую попытку
+                self._fail_pending(f"не удалось запустить процесс-обработчик: {e}")
+            return False
+        writer.close()  # иначе конец канала не закроется вместе с процессом
+        self.workers[worker_id] = _Worker(worker_id, process, task_queue, reader)
+        return True
+
+    def _retire_worker(self, worker, kill=False):
+        self.workers.pop(worker.worker_id, None)
+        if kill:
+            worker.process.kill()
+        worker.process.join(timeout=5)
+        worker.connection.close()
+        if worker.process.exitcode != 0:
+            # Убит или упал: close() бэкенда не вызывался
+            self._release_external(worker)
+
+    def _release_external(self, worker):
+        pids, dirs = worker.external
+        for pid in pids:
+            _kill_process(pid)
+        for path in dirs:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _fail_pending(self, message):
+        try: file_path, future = self.pending.get_nowait()
+        except queue.Empty: return
+        if future.set_running_or_notify_cancel():
+            future.set_result(_error_result(file_path, message))
+
+    def _fail_task(self, worker, message):
+        file_path, future, _ = worker.task
+        worker.task = None
+        future.set_result(_error_result(file_path, message))
+
+    def _handle_message(self, message):
+        kind, worker_id = message[0], message[1]
+        worker = self.workers.get(worker_id)
+        if worker is None: return  # процесс уже убит по таймауту
+        if kind == 'opened':
+            worker.external = (message[2], message[3])
+            return
+        if kind == 'failed':
+            # Бэкенд не запустился: задача (если была) получает ошибку, процесс будет запущен заново
+            self.crashes += 1
+            if worker.task: self._fail_task(worker, message[2])
+            self._retire_worker(worker)
+            return
+        file_path, recycle = message[2], message[-1]
+        _, future, _ = worker.task
+        worker.task = None
+        if kind == 'done':
+            future.set_result((file_path,) + message[3:8])
+        else:
+            future.set_result(_error_result(file_path, message[3]))
+        if recycle:
+            self.restarts += 1
+            self._retire_worker(worker)
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            if worker.task and self.task_timeout and now - worker.task[2] > self.task_timeout:
+                self.timeouts += 1
+                self._fail_task(worker, f"превышено время обработки ({self.task_timeout} с)")
+                self._retire_worker(worker, kill=True)
+            elif not worker.process.is_alive():
+                # Состояние процесса проверяется один раз: иначе процесс, завершившийся между проверками,
+                # был бы остановлен как простаивающий, а его задача осталась бы без результата
+                if worker.task:
+                    # Процесс мог успеть отправить результат перед выходом — сначала забираем канал
+                    self._drain_results(worker)
+                if worker.task:
+                    self.crashes += 1
+                    self._fail_task(worker, f"обработчик аварийно завершился (код {worker.process.exitcode})")
+                self._retire_worker(worker)
+
+    def _receive(self, worker):
+        try: return worker.connection.recv()
+        except (EOFError, OSError): return None  # процесс завершился — им займется _check_workers
+
+    def _drain_results(self, worker):
+        while worker.worker_id in self.workers and worker.connection.poll():
+            message = self._receive(worker)
+            if message is None: return
+            self._handle_message(message)
+
+    def _wait_results(self):
+        workers = {worker.connection: worker for worker in self.workers.values()}
+        if not workers:
+            time.sleep(_POLL_INTERVAL)
+            return
+        for connection in multiprocessing.connection.wait(list(workers), timeout=_POLL_INTERVAL):
+            worker = workers[connection]
+            if worker.worker_id not in self.workers: continue  # уже остановлен при разборе другого сообщения
+            message = self._receive(worker)
+            if message is not None: self._handle_message(message)
+
+    def _dispatch(self):
+        for worker in self.workers.values():
+            if worker.task is not None: continue
+            try: file_path, future = self.pending.get_nowait()
+            except queue.Empty: return
+            if not future.set_running_or_notify_cancel(): continue  # отменен до начала обработки
+            worker.task = (file_path, future, time.monotonic())
+            worker.task_queue.put(file_path)
+
+    def _manage(self):
+        try:
+            while True:
+                busy = any(worker.task for worker in self.workers.values())
+                if self.shutting_down and self.pending.empty() and not busy: break
+                if not self.pending.empty():
+                    while len(self.workers) < self.workers_count and self._start_worker(): pass
+                self._dispatch()
+                self._wait_results()
+                self._check_workers()
+        except Exception as e:
+            print(f"Сбой управляющего потока пула: {e}", file=sys.stderr)
+        finally:
+            # Пул больше не принимает задачи, а уже принятые получают ошибку: иначе их результата ждали бы вечно
+            with self.lock:
+                self.shutting_down = True
+            while not self.pending.empty():
+                self._fail_pending("пул остановлен")
+            for worker in list(self.workers.values()):
+                if worker.task: self._fail_task(worker, "пул остановлен")
+                worker.task_queue.put(None)
+            for worker in list(self.workers.values()):
+                self._retire_worker(worker)